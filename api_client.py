@@ -0,0 +1,394 @@
+import hashlib
+import itertools
+import json
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+from urllib3.util.connection import _DEFAULT_TIMEOUT, allowed_gai_family
+
+import json_codec
+from async_engine import gather_requests
+from throttle import HostGuard, retry_after
+
+# methods that are safe to send again if the connection drops
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "PUT", "DELETE", "OPTIONS"])
+# statuses an idempotent request is retried on
+RETRY_STATUSES = frozenset([429, 502, 503, 504])
+
+# per request timing breakdown in ms, in the order they happen
+PHASES = ("dns", "connect", "tls", "ttfb", "download", "json")
+
+# phases of the last request sent on this thread, filled in by the pool
+_last_phases = threading.local()
+
+
+class ConnectionStats:
+    # counts requests sent on a fresh TCP connection vs. one taken back from the pool
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.new_connections = 0
+        self.reused_connections = 0
+
+    def record_request(self, reused):
+        with self._lock:
+            if reused:
+                self.reused_connections += 1
+            else:
+                self.new_connections += 1
+
+    @property
+    def requests(self):
+        return self.new_connections + self.reused_connections
+
+
+def connect_any(addresses, timeout, source_address=None, socket_options=None):
+    # urllib3.util.connection.create_connection's loop over already resolved addresses
+    error = None
+    for family, socktype, proto, _, address in addresses:
+        sock = None
+        try:
+            sock = socket.socket(family, socktype, proto)
+            for option in socket_options or ():
+                sock.setsockopt(*option)
+            if timeout is not _DEFAULT_TIMEOUT:
+                sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            sock.connect(address)
+            return sock
+        except OSError as e:
+            error = e
+            if sock is not None:
+                sock.close()
+    if error is not None:
+        raise error
+    raise OSError("getaddrinfo returns an empty list")
+
+
+def instrumented_pool(base, stats):
+    # wrap a urllib3 pool class so every request reports whether its socket was already open
+    # and how long DNS, TCP connect, TLS and the wait for the first byte took
+    class Connection(base.ConnectionCls):
+        connect_phases = None
+
+        def _new_conn(self):
+            # same as urllib3's, every resolved address is still tried in family order,
+            # the lookup is just done here so it can be timed apart from the connect
+            started = time.perf_counter()
+            try:
+                addresses = socket.getaddrinfo(self._dns_host.strip("[]"), self.port, allowed_gai_family(),
+                                               socket.SOCK_STREAM)
+            except socket.gaierror as e:
+                raise NameResolutionError(self.host, self, e) from e
+            resolved = time.perf_counter()
+            try:
+                sock = connect_any(addresses, self.timeout, self.source_address, self.socket_options)
+            except socket.timeout as e:
+                raise ConnectTimeoutError(
+                    self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})") from e
+            except OSError as e:
+                raise NewConnectionError(self, f"Failed to establish a new connection: {e}") from e
+            self.connect_phases = {"dns": (resolved - started) * 1000, "connect": (time.perf_counter() - resolved) * 1000}
+            return sock
+
+        def connect(self):
+            started = time.perf_counter()
+            super().connect()
+            phases = self.connect_phases or {"dns": 0.0, "connect": 0.0}
+            # plain http has no handshake, the phase is left out rather than reported as 0
+            if base.scheme == "https":
+                phases["tls"] = max((time.perf_counter() - started) * 1000 - phases["dns"] - phases["connect"], 0.0)
+            self.connect_phases = phases
+
+    class Pool(base):
+        ConnectionCls = Connection
+
+        def _make_request(self, conn, *args, **kwargs):
+            reused = getattr(conn, "sock", None) is not None
+            conn.connect_phases = None
+            started = time.perf_counter()
+            response = super()._make_request(conn, *args, **kwargs)
+            waited = (time.perf_counter() - started) * 1000
+            stats.record_request(reused)
+            phases = dict(conn.connect_phases or {"dns": 0.0, "connect": 0.0})
+            if self.scheme == "https":
+                phases.setdefault("tls", 0.0)
+            phases["ttfb"] = max(waited - phases["dns"] - phases["connect"] - phases.get("tls", 0.0), 0.0)
+            _last_phases.value = phases
+            return response
+
+    return Pool
+
+
+class PooledAdapter(HTTPAdapter):
+    def __init__(self, stats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: instrumented_pool(pool_cls, self.stats)
+            for scheme, pool_cls in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+
+def request_key(method, url, params=None, json_body=None, data=None):
+    # method + url + hash of whatever goes in the body
+    if json_body is not None:
+        body = json.dumps(json_body, sort_keys=True).encode()
+    elif isinstance(data, str):
+        body = data.encode()
+    else:
+        body = data or b""
+    if params:
+        url = f"{url}?{sorted(dict(params).items())}"
+    return f"{method.upper()} {url} {hashlib.sha1(body).hexdigest()}"
+
+
+def not_sent(error):
+    # the connection was never made, so even a POST can go again
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(error, requests.ConnectTimeout) or isinstance(reason, (NewConnectionError, NameResolutionError))
+
+
+class ApiResponse(requests.Response):
+    # {phase: ms} set by ApiClient, see PHASES
+    timings = None
+    # True when it came from a cassette, its timings are the recorded ones and stay out of history
+    replayed = False
+    # numbered by the client as it is received, tests that read the same response see the same number
+    request_id = None
+
+    # parses the body once no matter how many assertions call .json()
+    def json(self, **kwargs):
+        if kwargs:
+            return super().json(**kwargs)
+        if not hasattr(self, "_parsed_json"):
+            started = time.perf_counter()
+            self._parsed_json = json_codec.loads(self.content)
+            if self.timings is not None:
+                self.timings["json"] = (time.perf_counter() - started) * 1000
+        return self._parsed_json
+
+
+class ResponseCache:
+    # LRU of responses, entries also expire after ttl seconds
+    def __init__(self, maxsize=256, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, response):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class ApiClient:
+    # one keep-alive session shared by the whole test run
+    def __init__(self, pool_size=10, retries=3, backoff_factor=0.3, connect_timeout=3.05, read_timeout=10.0,
+                 cache_size=256, cache_ttl=300.0, record_timings=False, cassette=None, rate_limit=0.0, rate_burst=None,
+                 breaker_threshold=5, breaker_cooldown=30.0, retry_after_max=1.0):
+        self.timeout = (connect_timeout, read_timeout)
+        # retries are done here rather than by urllib3 so every attempt passes the rate limiter and breaker,
+        # a server's Retry-After is honoured up to retry_after_max seconds
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.retry_after_max = retry_after_max
+        self.stats = ConnectionStats()
+        # only GETs are cached, tests that must hit the wire turn this off
+        # (responses shared by the checks of a spec are kept in shared instead, see request())
+        self.cache = ResponseCache(cache_size, cache_ttl) if cache_size > 0 else None
+        self.cache_enabled = True
+        self.shared = {}
+        # responses fetched ahead of time by prefetch(), any method, dropped once used;
+        # the rest of the requests wait in _pending and go out a window at a time
+        self.prefetched = OrderedDict()
+        self._pending = None
+        self._window = None
+        self._concurrency = 8
+        # (test, method, path, status, {phase: ms}) for every request that went over the wire
+        self.record_timings = record_timings
+        self.timings = []
+        self._request_ids = itertools.count(1)
+        # cassette.Cassette to record to / replay from, None sends everything
+        self.cassette = cassette
+        # per host pacing (off unless rate_limit > 0) and circuit breaker (off when breaker_threshold is 0)
+        self.guard = HostGuard(rate_limit, rate_burst, breaker_threshold, breaker_cooldown)
+        # whatever the last request returned (wire, cache or prefetch) and its (method, path), for per-test reporting
+        self.last_request = None
+        self.last_response = None
+        adapter = PooledAdapter(self.stats, pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method, url, cache=None, share=None, timed=True, **kwargs):
+        # share names a group of checks that read one response (a RequestSpec): each group keeps its
+        # last response until it asks for a different request, whatever the cache size or ttl;
+        # timed=False keeps the request out of the recorded timings (warm-up calls)
+        key = request_key(method, url, kwargs.get("params"), kwargs.get("json"), kwargs.get("data")) if share else None
+        entry = self.shared.get(share) if share else None
+        if entry is not None and entry[0] == key:
+            response = entry[1]
+        else:
+            response = self._request(method, url, cache, timed, **kwargs)
+            if share:
+                self.shared[share] = (key, response)
+        self.last_request = (method.upper(), urlsplit(url).path)
+        self.last_response = response
+        return response
+
+    def _request(self, method, url, cache, timed=True, **kwargs):
+        # a streamed body can only be read once, so it is never shared
+        cache = (self.cache_enabled if cache is None else cache) and not kwargs.get("stream")
+        key = request_key(method, url, kwargs.get("params"), kwargs.get("json"), kwargs.get("data"))
+        use_cache = cache and self.cache is not None and method.upper() == "GET"
+        if cache and key in self.prefetched:
+            response = self.prefetched.pop(key)
+            if use_cache:
+                self.cache.put(key, response)
+            if self._pending is not None and len(self.prefetched) <= self._window // 2:
+                self._prefetch_window()
+            return response
+        if use_cache:
+            response = self.cache.get(key)
+            if response is not None:
+                return response
+        response = self.send(method, url, **kwargs)
+        response.request_id = next(self._request_ids)
+        if self.record_timings and timed and not response.replayed:
+            self.record(method, url, response)
+        if use_cache and response.ok:
+            self.cache.put(key, response)
+        return response
+
+    def send(self, method, url, stream=False, **kwargs):
+        if self.cassette is not None:
+            # keyed without scheme and host so a cassette recorded against one server replays against another
+            key = request_key(method, urlsplit(url)._replace(scheme="", netloc="").geturl(),
+                              kwargs.get("params"), kwargs.get("json"), kwargs.get("data"))
+            response = self.cassette.play(key) if self.cassette.replaying else None
+            if response is not None:
+                response.__class__ = ApiResponse
+                response.replayed = True
+                return response
+        response = self._send(method, url, stream, **kwargs)
+        if self.cassette is not None and self.cassette.recording and not stream:
+            self.cassette.record(key, method, response)
+        return response
+
+    def _send(self, method, url, stream, **kwargs):
+        # always stream from requests so the body download can be timed on its own
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlsplit(url).netloc
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            self.guard.before(host)
+            _last_phases.value = None
+            try:
+                response = self.session.request(method, url, stream=True, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                self.guard.after(host)
+                if last or not (idempotent or not_sent(error)):
+                    raise
+                time.sleep(self.backoff(attempt))
+                continue
+            self.guard.after(host, response)
+            if last or not idempotent or response.status_code not in RETRY_STATUSES:
+                break
+            delay = max(self.backoff(attempt), min(retry_after(response) or 0.0, self.retry_after_max))
+            response.close()
+            time.sleep(delay)
+        response.__class__ = ApiResponse
+        response.timings = dict(_last_phases.value or {})
+        if not stream:
+            started = time.perf_counter()
+            response.content
+            response.timings["download"] = (time.perf_counter() - started) * 1000
+        response.timings["total"] = response.elapsed.total_seconds() * 1000
+        return response
+
+    def backoff(self, attempt):
+        return self.backoff_factor * 2 ** attempt
+
+    def record(self, method, url, response):
+        # pytest sets PYTEST_CURRENT_TEST to "<nodeid> (<phase>)" while a test runs,
+        # the timings dict is shared with the response so a later json() parse still lands in it,
+        # the endpoint keeps the query (params included) so ?_page=2 is not compared with the whole collection
+        test = os.environ.get("PYTEST_CURRENT_TEST", "").rsplit(" ", 1)[0]
+        parts = urlsplit(response.request.url if response.request is not None else url)
+        endpoint = f"{parts.path}?{parts.query}" if parts.query else parts.path
+        self.timings.append((test, method.upper(), endpoint, response.status_code, response.timings))
+
+    def prefetch(self, requests, concurrency=8, window=None):
+        # send (method, url, kwargs) requests concurrently, later identical requests get these responses;
+        # with a window only that many go out now, the next ones once half of them have been used
+        self._pending = iter(requests)
+        self._window = window
+        self._concurrency = concurrency
+        return self._prefetch_window()
+
+    def _prefetch_window(self):
+        batch = list(itertools.islice(self._pending, self._window))
+        if self._window is None or len(batch) < self._window:
+            self._pending = None
+        unique = {}
+        for method, url, kwargs in batch:
+            unique.setdefault(request_key(method, url, kwargs.get("params"), kwargs.get("json"), kwargs.get("data")),
+                              (method, url, kwargs))
+        responses = gather_requests(self, list(unique.values()), self._concurrency)
+        for key, response in zip(unique, responses):
+            if not isinstance(response, Exception):
+                self.prefetched[key] = response
+        if self._window is not None:
+            # whatever no test asked for (deselected, different order) does not pile up
+            while len(self.prefetched) > 2 * self._window:
+                self.prefetched.popitem(last=False)
+        return responses
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+        if self.cassette is not None:
+            self.cassette.save()
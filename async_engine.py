@@ -0,0 +1,22 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+async def _send(client, semaphore, method, url, kwargs):
+    async with semaphore:
+        # the pooled session does the I/O, the event loop only schedules it
+        return await asyncio.to_thread(client.request, method, url, cache=False, **kwargs)
+
+
+async def _gather(client, requests, concurrency):
+    # to_thread runs on the loop's default executor, sized here so it never caps concurrency
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="prefetch")
+    asyncio.get_running_loop().set_default_executor(executor)
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [_send(client, semaphore, method, url, kwargs) for method, url, kwargs in requests]
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def gather_requests(client, requests, concurrency=8):
+    # responses (or the exception raised) in the same order as requests
+    return asyncio.run(_gather(client, requests, concurrency))
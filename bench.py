@@ -0,0 +1,154 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+
+import json_codec
+import result_sink
+import test_api
+from api_client import ApiClient
+from dataset import RecordIndex
+from latency import summarize
+from mock_server import MockApiServer
+
+# times what the harness does around each request, against the local mock server,
+# so harness overhead can be told apart from API latency and tracked between changes
+# python bench.py --iterations 2000 --json bench.json
+# python bench.py --baseline bench.json   (exit 1 when an operation got slower than --tolerance)
+
+SPECS = (test_api.GET_ALL_POSTS, test_api.GET_POST_BY_ID, test_api.CREATE_POST, test_api.UPDATE_POST,
+         test_api.DELETE_POST)
+
+
+def measure(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def harness_operations(client, base_url, test_data_path):
+    # (name, callable) for everything a test does besides waiting on the API
+    test_data = RecordIndex(test_data_path)
+    record = test_data[0]
+    operations = []
+
+    def client_setup():
+        ApiClient().close()
+
+    def index_test_data():
+        RecordIndex(test_data_path).close()
+
+    counter = itertools.count()
+
+    def read_record():
+        return test_data[next(counter) % len(test_data)]
+
+    operations += [("client setup", client_setup), ("test_data index", index_test_data),
+                   ("test_data record", read_record)]
+
+    posts = client.request("GET", f"{base_url}/posts", cache=False)
+    for name in json_codec.DECODERS:
+        try:
+            loads = json_codec.DECODERS[name]()
+        except ImportError:
+            continue
+        operations.append((f"json decode {name} /posts", lambda loads=loads: loads(posts.content)))
+
+    operations.append(("log_result_to_file", lambda: test_api.log_result_to_file(
+        "bench", "GET", f"{base_url}/posts", posts, "Success")))
+
+    for spec in SPECS:
+        payload = spec.payload(record) if spec.payload else None
+        response = client.request(spec.method, spec.url(base_url, resources="posts", post_id=1), cache=False,
+                                  json=payload)
+        # decoded once up front, json() is memoized so only the checks themselves are timed
+        response.json()
+
+        def run_checks(spec=spec, response=response):
+            for check in spec.checks:
+                check(response, 1, record)
+
+        operations.append((f"checks {spec.name}", run_checks))
+    return operations, test_data
+
+
+def run(base_url, iterations, warmup, test_data_path):
+    client = ApiClient(cache_size=0)
+    operations, test_data = harness_operations(client, base_url, test_data_path)
+    # the API side for comparison, one keep-alive round trip
+    operations.append(("round trip GET /posts/1",
+                       lambda: client.request("GET", f"{base_url}/posts/1", cache=False).content))
+    rows = {}
+    try:
+        for name, func in operations:
+            measure(func, warmup)
+            samples = measure(func, iterations)
+            row = {"iterations": iterations, "mean": sum(samples) / len(samples) * 1e6}
+            row.update({key: value * 1e6 for key, value in summarize(samples).items()})
+            rows[name] = row
+    finally:
+        result_sink.close_sinks()
+        test_data.close()
+        client.close()
+    return rows
+
+
+def print_report(rows):
+    print(f"{'operation':<28}{'mean us':>11}{'p50 us':>11}{'p90 us':>11}{'p99 us':>11}{'max us':>11}")
+    for name, row in rows.items():
+        print(f"{name:<28}{row['mean']:>11.1f}{row['p50']:>11.1f}{row['p90']:>11.1f}{row['p99']:>11.1f}{row['max']:>11.1f}")
+
+
+def regressions(rows, baseline, tolerance):
+    # operations whose median grew by more than tolerance (0.25 = 25%) over the baseline file
+    slower = []
+    for name, row in rows.items():
+        before = baseline.get(name)
+        if before and row["p50"] > before["p50"] * (1 + tolerance):
+            slower.append((name, before["p50"], row["p50"]))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark the test harness against the local mock server")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--test-data", default="test_data.json")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--baseline", help="results of an earlier --json run to compare medians against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed median slowdown (default: 0.25)")
+    args = parser.parse_args()
+
+    test_data_path = os.path.abspath(args.test_data)
+    server = MockApiServer(seed_file=test_data_path).start()
+    cwd = os.getcwd()
+    # log_result_to_file writes to the working directory, keep it away from real results
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            rows = run(server.url, args.iterations, args.warmup, test_data_path)
+        finally:
+            os.chdir(cwd)
+            server.stop()
+
+    print_report(rows)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(rows, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            slower = regressions(rows, json.load(file), args.tolerance)
+        for name, before, after in slower:
+            print(f"REGRESSION {name}: p50 {before:.1f} us -> {after:.1f} us")
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
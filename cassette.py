@@ -0,0 +1,137 @@
+import base64
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import timedelta
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from result_sink import shard_path
+
+# recorded request/response pairs (with their timings) in a gzip'd JSON lines file,
+# looked up by method + path + body hash so reruns don't need the network
+#   record        send everything and write a fresh cassette
+#   replay        answer only from the cassette, a miss is an error
+#   replay-timed  like replay but wait as long as the recorded request took
+#   auto          replay what is there, send and record the rest
+
+MODES = ("auto", "record", "replay", "replay-timed")
+
+# the body is stored decoded, these would describe the wire format instead
+DROPPED_HEADERS = ("content-encoding", "transfer-encoding", "content-length")
+
+
+class CassetteMiss(LookupError):
+    pass
+
+
+def build_response(entry):
+    response = requests.Response()
+    response.status_code = entry["status"]
+    response.reason = entry.get("reason")
+    response.url = entry["url"]
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    response.encoding = get_encoding_from_headers(response.headers)
+    if "body_b64" in entry:
+        response._content = base64.b64decode(entry["body_b64"])
+    else:
+        response._content = entry["body"].encode()
+    response._content_consumed = True
+    response.elapsed = timedelta(seconds=entry["elapsed"])
+    response.timings = dict(entry.get("timings") or {})
+    return response
+
+
+class Cassette:
+    def __init__(self, path, mode="auto"):
+        if mode not in MODES:
+            raise ValueError(f"unknown cassette mode {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.worker = os.environ.get("PYTEST_XDIST_WORKER")
+        self.hits = 0
+        self.misses = 0
+        # key -> every exchange recorded for it, repeated requests replay them in turn
+        self.entries = {}
+        self._turns = {}
+        self._new = []
+        self._lock = threading.Lock()
+        if mode != "record" and os.path.exists(path):
+            self.load(path)
+
+    @property
+    def recording(self):
+        return self.mode in ("record", "auto")
+
+    @property
+    def replaying(self):
+        return self.mode != "record"
+
+    def load(self, path):
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            for line in file:
+                entry = json.loads(line)
+                self.entries.setdefault(entry["key"], []).append(entry)
+
+    def play(self, key):
+        with self._lock:
+            entries = self.entries.get(key)
+            if not entries:
+                self.misses += 1
+                if self.mode in ("replay", "replay-timed"):
+                    raise CassetteMiss(f"no recorded response for {key} in {self.path}")
+                return None
+            turn = self._turns.get(key, 0)
+            self._turns[key] = turn + 1
+            self.hits += 1
+        entry = entries[turn % len(entries)]
+        if self.mode == "replay-timed":
+            time.sleep(entry["elapsed"] + (entry.get("timings") or {}).get("download", 0) / 1000)
+        return build_response(entry)
+
+    def record(self, key, method, response):
+        entry = {
+            "key": key,
+            "method": method.upper(),
+            "url": response.url,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {name: value for name, value in response.headers.items() if name.lower() not in DROPPED_HEADERS},
+            "elapsed": response.elapsed.total_seconds(),
+            "timings": {phase: ms for phase, ms in (response.timings or {}).items() if phase != "json"},
+        }
+        try:
+            entry["body"] = response.content.decode()
+        except UnicodeDecodeError:
+            entry["body_b64"] = base64.b64encode(response.content).decode()
+        # only saved, not replayed in this run, repeated requests (latency samples) all stay real
+        with self._lock:
+            self._new.append(entry)
+
+    def save(self):
+        if not self._new:
+            return
+        # xdist workers write shards, merge_shards() folds them in on the controller
+        path = shard_path(self.path, self.worker) if self.worker else self.path
+        # gzip members can be concatenated, so "auto" just appends another one
+        file_mode = "at" if self.mode == "auto" and not self.worker else "wt"
+        with gzip.open(path, file_mode, encoding="utf-8") as file:
+            for entry in self._new:
+                file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._new.clear()
+
+
+def merge_shards(path, overwrite):
+    shards = sorted(glob.glob(shard_path(path, "gw*")))
+    if not shards:
+        return
+    with open(path, "wb" if overwrite else "ab") as out:
+        for shard in shards:
+            with open(shard, "rb") as file:
+                out.write(file.read())
+            os.remove(shard)
@@ -0,0 +1,50 @@
+import pytest
+
+# one request, many assertions: every Check of a RequestSpec is collected as its own test
+# (and writes its own result row) but they all read the response of a single request
+
+
+class Check:
+    # func(response, post_id, post_data) -> (passed, message written when it fails),
+    # the streamed collection checks get the CollectionStats in place of a response
+    def __init__(self, test_name, func, marks=()):
+        self.test_name = test_name
+        self.func = func
+        self.marks = marks
+
+    @property
+    def name(self):
+        return self.func.__name__
+
+    def __call__(self, response, post_id=None, post_data=None):
+        return self.func(response, post_id, post_data)
+
+
+class RequestSpec:
+    # path is formatted with resources/post_id, payload(record) builds the body of
+    # per record requests (POST/PUT), specs without a payload send no body
+    def __init__(self, name, method, path, checks, payload=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.checks = checks
+        self.payload = payload
+
+    def url(self, base_url, **values):
+        return f"{base_url}/{self.path.format(**values)}"
+
+    def request(self, base_url, record=None, **values):
+        # (method, url, request kwargs) the way run_check sends it, for prefetching and load generation
+        kwargs = {"json": self.payload(record)} if self.payload else {}
+        return self.method, self.url(base_url, **values), kwargs
+
+    def params(self):
+        # grouped so that with -n N --dist loadgroup all checks of the spec run on one worker and share
+        # one request, per record checks also get the record's group (see pytest_generate_tests)
+        group = pytest.mark.xdist_group(self.name)
+        return [pytest.param(self, check, id=f"{self.name}-{check.name}", marks=[group, *check.marks])
+                for check in self.checks]
+
+
+def spec_params(*specs):
+    return [param for spec in specs for param in spec.params()]
@@ -0,0 +1,329 @@
+import argparse
+import os
+
+import pytest
+
+import cassette
+import history
+import json_codec
+import profiling
+import report
+import result_sink
+from api_client import PHASES, ApiClient
+from dataset import RecordIndex
+from endpoints import DEFAULT_BASE_URL
+from latency import LatencyProbe, parse_thresholds
+
+client_key = pytest.StashKey[ApiClient]()
+test_index_key = pytest.StashKey[dict]()
+test_data_key = pytest.StashKey[RecordIndex]()
+# connection/cache counters and request timings sent back by xdist workers
+worker_stats_key = pytest.StashKey[list]()
+worker_timings_key = pytest.StashKey[list]()
+report_writer_key = pytest.StashKey[report.ReportWriter]()
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("api", "API client")
+    group.addoption("--api-url", default=os.environ.get("API_BASE_URL", DEFAULT_BASE_URL),
+                    help="API root to test, 'mock' starts the bundled local server (default: $API_BASE_URL or jsonplaceholder)")
+    group.addoption("--pool-size", type=int, default=10, help="keep-alive connections kept per host (default: 10)")
+    group.addoption("--retries", type=int, default=3, help="retries for idempotent requests (default: 3)")
+    group.addoption("--retry-after-max", type=float, default=1.0,
+                    help="longest Retry-After wait honoured before a retry, in seconds (default: 1)")
+    group.addoption("--connect-timeout", type=float, default=3.05, help="connect timeout in seconds (default: 3.05)")
+    group.addoption("--read-timeout", type=float, default=10.0, help="read timeout in seconds (default: 10)")
+    group.addoption("--rate-limit", type=float, default=0.0,
+                    help="requests per second per host, halved on 429/503 and grown back after (default: 0, unlimited)")
+    group.addoption("--rate-burst", type=float, help="requests a host may get at once (default: one second's worth)")
+    group.addoption("--breaker-threshold", type=int, default=5,
+                    help="consecutive failures (errors or 5xx) before a host fails fast, 0 disables (default: 5)")
+    group.addoption("--breaker-cooldown", type=float, default=30.0,
+                    help="seconds a tripped host fails fast before one probe request is let through (default: 30)")
+    group.addoption("--cache-size", type=int, default=256, help="cached GET responses, 0 disables the cache (default: 256)")
+    group.addoption("--cache-ttl", type=float, default=300.0, help="seconds a cached GET response stays valid (default: 300)")
+    group.addoption("--json-decoder", default="auto", choices=["auto", *json_codec.DECODERS],
+                    help="decoder for response bodies, auto prefers orjson then msgspec (default: auto)")
+    group.addoption("--cassette", metavar="PATH", help="record responses to / replay them from this .jsonl.gz file")
+    group.addoption("--cassette-mode", default="auto", choices=cassette.MODES,
+                    help="auto replays what is recorded and records the rest, replay-timed also waits the recorded time (default: auto)")
+    group.addoption("--test-data",
+                    help="JSON array or .jsonl file of post payloads, POST/PUT checks run once per record "
+                         "(default: test_data.json in the rootdir)")
+    group.addoption("--async", action="store_true", dest="async_prefetch",
+                    help="send each module's request_matrix concurrently from one event loop before its tests run "
+                         "(not on xdist workers)")
+    group.addoption("--async-concurrency", type=positive_int, default=8,
+                    help="requests in flight at once with --async, at most --pool-size (default: 8)")
+    group.addoption("--async-window", type=int, default=64,
+                    help="requests prefetched ahead of the tests with --async, 0 sends all at once (default: 64)")
+
+    group = parser.getgroup("report", "result reporting")
+    group.addoption("--summary-report", metavar="DIR",
+                    help="stream results into DIR/results.sqlite and render a paged HTML summary there")
+    group.addoption("--profile-tests", metavar="DIR",
+                    help="profile fixture setup and call of every test, one file per test in DIR")
+    group.addoption("--profile-mode", default="cprofile", choices=profiling.MODES,
+                    help="cprofile (.prof) or a stack sampler (.folded collapsed stacks) (default: cprofile)")
+    group.addoption("--profile-interval", type=float, default=0.001,
+                    help="seconds between stack samples in sample mode (default: 0.001)")
+
+    group = parser.getgroup("latency", "latency checks")
+    group.addoption("--history-db", default=history.DEFAULT_DB,
+                    help=f"sqlite file every request's timing is appended to (default: {history.DEFAULT_DB})")
+    group.addoption("--no-history", action="store_const", const=None, dest="history_db", help="do not record timings")
+    group.addoption("--latency-samples", type=positive_int, default=20, help="timed requests per latency check (default: 20)")
+    group.addoption("--latency-warmup", type=int, default=3, help="untimed requests sent first (default: 3)")
+    group.addoption("--latency-percentile", type=float, default=95, help="percentile compared to the threshold (default: 95)")
+    group.addoption("--latency-threshold", action="append", default=[], metavar="METHOD[ PATH]=MS",
+                    help="override a threshold, e.g. 'GET=250' or 'PUT /posts/1=500', can be repeated")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "no_cache: always send the request instead of reusing a cached GET response")
+    config.stash[worker_stats_key] = []
+    config.stash[worker_timings_key] = []
+    try:
+        json_codec.use(config.getoption("--json-decoder"))
+    except ImportError as e:
+        raise pytest.UsageError(f"--json-decoder {config.getoption('--json-decoder')}: the {e.name} package "
+                                f"is not installed") from e
+    try:
+        parse_thresholds(config.getoption("--latency-threshold"))
+    except ValueError as e:
+        raise pytest.UsageError(f"--latency-threshold {e}") from e
+    if config.getoption("async_prefetch") and config.getoption("--async-concurrency") > config.getoption("--pool-size"):
+        # the extra requests would each open a connection the pool cannot keep
+        raise pytest.UsageError(f"--async-concurrency {config.getoption('--async-concurrency')} is more than "
+                                f"--pool-size {config.getoption('--pool-size')}")
+    # xdist forwards every report to the controller, so only it writes the summary
+    if config.getoption("--summary-report") and not hasattr(config, "workerinput"):
+        writer = config.stash[report_writer_key] = report.ReportWriter(config.getoption("--summary-report"))
+        config.pluginmanager.register(writer, "summary_report")
+    if config.getoption("--profile-tests"):
+        config.pluginmanager.register(profiling.TestProfiler(config.getoption("--profile-tests"),
+                                                             config.getoption("--profile-mode"),
+                                                             config.getoption("--profile-interval")), "test_profiler")
+
+
+def pytest_unconfigure(config):
+    if test_data_key in config.stash:
+        config.stash[test_data_key].close()
+
+
+def test_data_path(config):
+    return config.getoption("--test-data") or str(config.rootpath / "test_data.json")
+
+
+def get_test_data(config):
+    # indexed the first time a test needs it, parametrization needs the record count at collection time
+    if test_data_key not in config.stash:
+        path = test_data_path(config)
+        try:
+            config.stash[test_data_key] = RecordIndex(path)
+        except (OSError, ValueError) as e:
+            raise pytest.UsageError(f"--test-data {path}: {e}") from e
+    return config.stash[test_data_key]
+
+
+def pytest_generate_tests(metafunc):
+    if "record" in metafunc.fixturenames:
+        count = len(get_test_data(metafunc.config))
+        # the record's xdist_group joins the spec's (checks.RequestSpec.params), one group per spec and record
+        metafunc.parametrize("record", [pytest.param(index, id=f"record{index}", marks=pytest.mark.xdist_group(f"record{index}"))
+                                        for index in range(count)], indirect=True)
+
+
+@pytest.fixture(scope="session")
+def test_data(request):
+    return get_test_data(request.config)
+
+
+# one payload from --test-data, read from disk when the test needs it
+@pytest.fixture()
+def record(request, test_data):
+    return test_data[request.param]
+
+
+def pytest_collection_finish(session):
+    session.config.stash[test_index_key] = {item.nodeid: index for index, item in enumerate(session.items)}
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_protocol(item):
+    result_sink.set_test_index(item.config.stash[test_index_key].get(item.nodeid, 0))
+
+
+# one pooled client for the whole run, every test goes through it
+@pytest.fixture(scope="session")
+def client(request):
+    config = request.config
+    api_client = ApiClient(
+        pool_size=config.getoption("--pool-size"),
+        retries=config.getoption("--retries"),
+        retry_after_max=config.getoption("--retry-after-max"),
+        connect_timeout=config.getoption("--connect-timeout"),
+        read_timeout=config.getoption("--read-timeout"),
+        rate_limit=config.getoption("--rate-limit"),
+        rate_burst=config.getoption("--rate-burst"),
+        breaker_threshold=config.getoption("--breaker-threshold"),
+        breaker_cooldown=config.getoption("--breaker-cooldown"),
+        cache_size=config.getoption("--cache-size"),
+        cache_ttl=config.getoption("--cache-ttl"),
+        record_timings=config.getoption("--history-db") is not None,
+        cassette=cassette.Cassette(config.getoption("--cassette"), config.getoption("--cassette-mode"))
+        if config.getoption("--cassette") else None,
+    )
+    config.stash[client_key] = api_client
+    yield api_client
+    api_client.close()
+
+
+# thresholds passed on the command line win over the ones the test module declares
+@pytest.fixture(scope="module")
+def latency(request, client):
+    config = request.config
+    thresholds = dict(getattr(request.module, "LATENCY_THRESHOLDS", {}))
+    thresholds.update(parse_thresholds(config.getoption("--latency-threshold")))
+    return LatencyProbe(
+        client,
+        samples=config.getoption("--latency-samples"),
+        warmup=config.getoption("--latency-warmup"),
+        pct=config.getoption("--latency-percentile"),
+        thresholds=thresholds,
+    )
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _async_prefetch(request):
+    # an xdist worker only learns which tests it runs one at a time, prefetching the matrix there
+    # would send every request once per worker
+    if not request.config.getoption("async_prefetch") or hasattr(request.config, "workerinput"):
+        return
+    try:
+        matrix = request.getfixturevalue("request_matrix")
+    except pytest.FixtureLookupError:
+        return
+    api_client = request.getfixturevalue("client")
+    api_client.prefetch(matrix, request.config.getoption("--async-concurrency"),
+                        request.config.getoption("--async-window") or None)
+
+
+@pytest.fixture(autouse=True)
+def _no_cache_marker(request):
+    if request.node.get_closest_marker("no_cache") is None:
+        yield
+        return
+    api_client = request.getfixturevalue("client")
+    enabled = api_client.cache_enabled
+    api_client.cache_enabled = False
+    yield
+    api_client.cache_enabled = enabled
+
+
+def pytest_runtest_setup(item):
+    api_client = item.config.stash.get(client_key, None)
+    if api_client is not None:
+        api_client.last_response = None
+
+
+# timing breakdown of the last response a test used, shown as columns in report.html
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    report = outcome.get_result()
+    api_client = item.config.stash.get(client_key, None)
+    if report.when == "call" and api_client is not None and api_client.last_response is not None:
+        report.user_properties.append(("timings", dict(api_client.last_response.timings or {})))
+        # the id tells the report which tests read one response, numbered per xdist worker
+        worker = getattr(item.config, "workerinput", {}).get("workerid", "main")
+        request_id = f"{worker}-{api_client.last_response.request_id}"
+        report.user_properties.append(("request", (*api_client.last_request, api_client.last_response.status_code,
+                                                   request_id)))
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_html_results_table_header(cells):
+    cells.extend(f"<th>{phase.upper() if phase in ('dns', 'tls', 'ttfb', 'json') else phase.title()} ms</th>"
+                 for phase in PHASES)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_html_results_table_row(report, cells):
+    timings = dict(report.user_properties).get("timings", {})
+    cells.extend(f"<td>{timings[phase]:.1f}</td>" if phase in timings else "<td></td>" for phase in PHASES)
+
+
+def client_counters(api_client):
+    counters = {
+        "new_connections": api_client.stats.new_connections,
+        "reused_connections": api_client.stats.reused_connections,
+        **api_client.guard.counters(),
+    }
+    if api_client.cache is not None:
+        counters["cache_hits"] = api_client.cache.hits
+        counters["cache_misses"] = api_client.cache.misses
+    if api_client.cassette is not None:
+        counters["cassette_hits"] = api_client.cassette.hits
+        counters["cassette_misses"] = api_client.cassette.misses
+    return counters
+
+
+def pytest_sessionfinish(session):
+    result_sink.close_sinks()
+    api_client = session.config.stash.get(client_key, None)
+    if hasattr(session.config, "workeroutput"):
+        if api_client is not None:
+            session.config.workeroutput["client_counters"] = client_counters(api_client)
+            session.config.workeroutput["timings"] = api_client.timings
+        return
+    # on the xdist controller (or a plain run) fold the worker shards into one file
+    result_sink.merge_all()
+    if report_writer_key in session.config.stash:
+        session.config.stash[report_writer_key].close()
+    if session.config.getoption("--cassette"):
+        cassette.merge_shards(session.config.getoption("--cassette"), session.config.getoption("--cassette-mode") == "record")
+    timings = list(session.config.stash[worker_timings_key])
+    if api_client is not None:
+        timings.extend(api_client.timings)
+    db_path = session.config.getoption("--history-db")
+    if db_path and timings:
+        history.record_run(db_path, session.config.getoption("--api-url"), timings)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    output = getattr(node, "workeroutput", {})
+    if output.get("client_counters"):
+        node.config.stash[worker_stats_key].append(output["client_counters"])
+    node.config.stash[worker_timings_key].extend(output.get("timings", []))
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    runs = list(config.stash[worker_stats_key])
+    api_client = config.stash.get(client_key, None)
+    if api_client is not None:
+        runs.append(client_counters(api_client))
+    if not runs:
+        return
+    totals = {}
+    for counters in runs:
+        for name, value in counters.items():
+            totals[name] = totals.get(name, 0) + value
+    new, reused = totals["new_connections"], totals["reused_connections"]
+    terminalreporter.write_sep("-", "connection pool")
+    terminalreporter.write_line(f"requests: {new + reused}  new connections: {new}  reused connections: {reused}")
+    if "cache_hits" in totals:
+        terminalreporter.write_line(f"response cache hits: {totals['cache_hits']}  misses: {totals['cache_misses']}")
+    if "cassette_hits" in totals:
+        terminalreporter.write_line(f"cassette hits: {totals['cassette_hits']}  misses: {totals['cassette_misses']}")
+    if totals["throttle_wait_ms"] or totals["breaker_opened"]:
+        terminalreporter.write_line(f"rate limit wait: {totals['throttle_wait_ms']} ms  circuit opened: "
+                                    f"{totals['breaker_opened']}  requests failed fast: {totals['breaker_rejected']}")
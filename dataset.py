@@ -0,0 +1,143 @@
+import json
+import re
+from array import array
+
+# test data files (a JSON array or JSON lines) indexed by byte offset,
+# only the offsets stay in memory and each record is decoded when it is used
+
+CHUNK_SIZE = 1 << 16
+STRUCTURAL = re.compile(rb'[\[\]{}",\\]')
+
+
+class ArrayScanner:
+    # finds the elements of a top level JSON array in a byte stream fed chunk by chunk,
+    # only structural bytes are looked at, plus the bytes of scalar elements to see they are there
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.skip_at = -1
+        # True once the opening [ has been seen
+        self.opened = False
+        # absolute offset where the element being read started (for a scalar, right after the
+        # [ or , before it), None between an object/array element and the next comma
+        self.start = None
+        # the element has non-whitespace content / is an object or array closed by its bracket
+        self.has_value = False
+        self.composite = False
+        self.position = 0
+
+    def _scalar_seen(self, chunk, end):
+        if not self.has_value and self.start is not None:
+            self.has_value = bool(chunk[max(self.start - self.position, 0):end].strip())
+        return self.has_value
+
+    def _next_element(self, start):
+        self.start = start
+        self.has_value = False
+        self.composite = False
+
+    def feed(self, chunk):
+        # (start, end) absolute offsets of the elements that end inside this chunk
+        spans = []
+        for match in STRUCTURAL.finditer(chunk):
+            offset = self.position + match.start()
+            if offset == self.skip_at:
+                continue
+            char = match.group()
+            if self.in_string:
+                if char == b"\\":
+                    self.skip_at = offset + 1
+                elif char == b'"':
+                    self.in_string = False
+                continue
+            if self.depth == 0:
+                if char != b"[" or self.opened:
+                    raise ValueError("not a JSON array")
+                self.opened = True
+                self.depth = 1
+                self._next_element(offset + 1)
+                continue
+            if self.depth == 1 and char in b'"[{' and self.start is not None and not self.has_value:
+                # a string, object or array element starts here
+                self.start = offset
+                self.has_value = True
+                self.composite = char != b'"'
+            if char == b'"':
+                self.in_string = True
+            elif char in b"[{":
+                self.depth += 1
+            elif char in b"]}":
+                self.depth -= 1
+                if self.depth == 1 and self.composite:
+                    spans.append((self.start, offset + 1))
+                    self.start = None
+                elif self.depth == 0:
+                    if self.start is not None and self._scalar_seen(chunk, match.start()):
+                        spans.append((self.start, offset))
+                    self.start = None
+            elif char == b"," and self.depth == 1:
+                if self.start is not None and self._scalar_seen(chunk, match.start()):
+                    spans.append((self.start, offset))
+                self._next_element(offset + 1)
+        if self.depth == 1:
+            self._scalar_seen(chunk, len(chunk))
+        self.position += len(chunk)
+        return spans
+
+
+def scan_json_array(file):
+    # yields (start, end) byte offsets of the elements of a top level JSON array
+    scanner = ArrayScanner()
+    while True:
+        chunk = file.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield from scanner.feed(chunk)
+
+
+class RecordIndex:
+    def __init__(self, path):
+        self.path = path
+        self.starts = array("q")
+        self.ends = array("q")
+        with open(path, "rb") as file:
+            spans = self._scan_lines(file) if path.endswith(".jsonl") else scan_json_array(file)
+            for start, end in spans:
+                self.starts.append(start)
+                self.ends.append(end)
+        self._file = None
+
+    @staticmethod
+    def _scan_lines(file):
+        offset = 0
+        for line in file:
+            if line.strip():
+                yield offset, offset + len(line)
+            offset += len(line)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _read(self, file, index):
+        file.seek(self.starts[index])
+        return json.loads(file.read(self.ends[index] - self.starts[index]))
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        if self._file is None:
+            self._file = open(self.path, "rb")
+        return self._read(self._file, index)
+
+    def __iter__(self):
+        # sequential read with its own handle, safe to use while __getitem__ is in use
+        with open(self.path, "rb") as file:
+            for index in range(len(self)):
+                yield self._read(file, index)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
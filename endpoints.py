@@ -0,0 +1,2 @@
+DEFAULT_BASE_URL = "https://jsonplaceholder.typicode.com"
+
@@ -0,0 +1,154 @@
+import argparse
+import math
+import sqlite3
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+# every request's timing breakdown from every run, so runs can be compared with each other
+# python history.py compare --runs 10
+
+DEFAULT_DB = "latency_history.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    target TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS samples (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    test TEXT NOT NULL,
+    method TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    status INTEGER,
+    phase TEXT NOT NULL,
+    ms REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_key ON samples (test, method, endpoint, phase, run_id);
+CREATE INDEX IF NOT EXISTS samples_run ON samples (run_id, phase);
+"""
+
+
+def connect(db_path):
+    db = sqlite3.connect(db_path, timeout=30)
+    db.executescript(SCHEMA)
+    return db
+
+
+def record_run(db_path, target, timings):
+    # timings are (test, method, endpoint, status, {phase: ms}) tuples from ApiClient
+    db = connect(db_path)
+    with db:
+        run_id = db.execute("INSERT INTO runs (started, target) VALUES (?, ?)", (time.time(), target)).lastrowid
+        db.executemany(
+            "INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((run_id, test, method, endpoint, status, phase, ms)
+             for test, method, endpoint, status, phases in timings
+             for phase, ms in phases.items()),
+        )
+    db.close()
+    return run_id
+
+
+def mann_whitney_greater(current, baseline):
+    # one sided p value for "current tends to be slower than baseline", normal approximation with tie correction
+    n1, n2 = len(current), len(baseline)
+    combined = sorted([(value, 0) for value in current] + [(value, 1) for value in baseline])
+    ranks = [0.0] * len(combined)
+    ties = 0.0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        size = j - i + 1
+        ties += size ** 3 - size
+        i = j + 1
+    rank_sum = sum(rank for rank, (_, group) in zip(ranks, combined) if group == 0)
+    u = rank_sum - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare(db_path, runs=10, alpha=0.05, min_change=0.1, phase="total"):
+    # latest run against the previous `runs` runs on the same target, per (method, endpoint):
+    # most tests send one request per run, too few samples per test for a rank test to ever fire
+    db = connect(db_path)
+    latest = db.execute("SELECT id, target FROM runs ORDER BY id DESC LIMIT 1").fetchone()
+    if latest is None:
+        db.close()
+        return []
+    latest_id, target = latest
+    baseline_ids = [row[0] for row in db.execute(
+        "SELECT id FROM runs WHERE target = ? AND id < ? ORDER BY id DESC LIMIT ?", (target, latest_id, runs))]
+    samples = defaultdict(lambda: ([], []))
+    if baseline_ids:
+        marks = ",".join("?" * len(baseline_ids))
+        query = f"SELECT run_id, method, endpoint, ms FROM samples WHERE phase = ? AND run_id IN (?, {marks})"
+        for run_id, method, endpoint, ms in db.execute(query, (phase, latest_id, *baseline_ids)):
+            samples[(method, endpoint)][0 if run_id == latest_id else 1].append(ms)
+    db.close()
+
+    findings = []
+    for key, (current, baseline) in sorted(samples.items()):
+        if not current or len(baseline) < 3:
+            continue
+        current_median = statistics.median(current)
+        baseline_median = statistics.median(baseline)
+        p_value = mann_whitney_greater(current, baseline)
+        change = current_median / baseline_median - 1 if baseline_median else 0.0
+        # p value if every current sample were slower than every baseline one, when even
+        # that is not significant the comparison cannot flag anything
+        best_p = mann_whitney_greater([1.0] * len(current), [0.0] * len(baseline))
+        findings.append({
+            "method": key[0], "endpoint": key[1], "samples": len(current), "baseline_samples": len(baseline),
+            "current_ms": current_median, "baseline_ms": baseline_median,
+            "change": change, "p_value": p_value,
+            "regression": p_value < alpha and change > min_change,
+            "insufficient": best_p >= alpha,
+        })
+    return findings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="latency history of the API test runs")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    commands = parser.add_subparsers(dest="command", required=True)
+    compare_cmd = commands.add_parser("compare", help="flag latency regressions of the latest run")
+    compare_cmd.add_argument("--runs", type=int, default=10, help="previous runs used as the baseline (default: 10)")
+    compare_cmd.add_argument("--alpha", type=float, default=0.05, help="significance level (default: 0.05)")
+    compare_cmd.add_argument("--min-change", type=float, default=0.1,
+                             help="ignore median slowdowns smaller than this fraction (default: 0.1)")
+    compare_cmd.add_argument("--phase", default="total", help="timing phase to compare (default: total)")
+    commands.add_parser("runs", help="list recorded runs")
+    args = parser.parse_args(argv)
+
+    if args.command == "runs":
+        db = connect(args.db)
+        for run_id, started, target, count in db.execute(
+                "SELECT id, started, target, (SELECT COUNT(*) FROM samples WHERE run_id = runs.id) FROM runs ORDER BY id"):
+            print(f"{run_id:>5}  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(started))}  {count:>7} samples  {target}")
+        db.close()
+        return 0
+
+    findings = compare(args.db, args.runs, args.alpha, args.min_change, args.phase)
+    if not findings:
+        print("not enough history to compare")
+        return 0
+    for row in findings:
+        flag = "REGRESSION" if row["regression"] else "too few" if row["insufficient"] else "ok"
+        print(f"{flag:<11}{row['method']:<7}{row['endpoint']:<20}{row['baseline_ms']:>9.1f}ms ->{row['current_ms']:>9.1f}ms "
+              f"{row['change']:>+7.1%}  p={row['p_value']:.3f}  n={row['samples']}/{row['baseline_samples']}")
+    return 1 if any(row["regression"] for row in findings) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
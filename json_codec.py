@@ -0,0 +1,43 @@
+import json
+
+# pluggable JSON decoder for response bodies: orjson or msgspec when installed, the stdlib otherwise
+
+
+def _orjson():
+    import orjson
+
+    return orjson.loads
+
+
+def _msgspec():
+    import msgspec
+
+    return msgspec.json.Decoder().decode
+
+
+def _stdlib():
+    return json.loads
+
+
+DECODERS = {"orjson": _orjson, "msgspec": _msgspec, "json": _stdlib}
+
+name = "json"
+loads = json.loads
+
+
+def use(decoder="auto"):
+    # "auto" picks the first one that imports
+    global name, loads
+    candidates = ["orjson", "msgspec", "json"] if decoder == "auto" else [decoder]
+    for candidate in candidates:
+        try:
+            loads = DECODERS[candidate]()
+        except ImportError:
+            if decoder != "auto":
+                raise
+            continue
+        name = candidate
+        return name
+
+
+use()
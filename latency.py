@@ -0,0 +1,119 @@
+import math
+from urllib.parse import urlsplit
+
+
+def percentile(values, pct):
+    # linear interpolation between closest ranks, values must be sorted
+    if not values:
+        return float("nan")
+    rank = (len(values) - 1) * pct / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def summarize(samples, percentiles=(50, 90, 99)):
+    ordered = sorted(samples)
+    summary = {f"p{pct}": percentile(ordered, pct) for pct in percentiles}
+    summary["max"] = ordered[-1] if ordered else float("nan")
+    return summary
+
+
+# z score for the two sided 95% interval
+Z_95 = 1.959964
+
+
+class LatencyStats:
+    def __init__(self, samples):
+        self.samples = sorted(samples)
+
+    def percentile(self, pct):
+        return percentile(self.samples, pct)
+
+    @property
+    def mean(self):
+        return sum(self.samples) / len(self.samples)
+
+    def percentile_ci(self, pct, z=Z_95):
+        # distribution free interval from the binomial ranks of the order statistics
+        n = len(self.samples)
+        q = pct / 100
+        spread = z * math.sqrt(n * q * (1 - q))
+        # n*q +- spread are 1-based ranks
+        low = min(max(math.floor(n * q - spread) - 1, 0), n - 1)
+        high = min(max(math.ceil(n * q + spread) - 1, 0), n - 1)
+        return self.samples[low], self.samples[high]
+
+
+class LatencyResult:
+    def __init__(self, method, url, samples, response, pct, threshold_ms):
+        self.method = method
+        self.url = url
+        self.samples = samples
+        self.stats = LatencyStats(samples)
+        self.response = response
+        self.pct = pct
+        self.threshold_ms = threshold_ms
+
+    @property
+    def value_ms(self):
+        return self.stats.percentile(self.pct) * 1000
+
+    @property
+    def ok(self):
+        return self.value_ms < self.threshold_ms
+
+    def describe(self):
+        low, high = self.stats.percentile_ci(self.pct)
+        return (f"p{self.pct:g}={self.value_ms:.1f}ms (95% CI {low * 1000:.1f}-{high * 1000:.1f}ms) "
+                f"threshold {self.threshold_ms:g}ms, n={len(self.stats.samples)}, mean={self.stats.mean * 1000:.1f}ms")
+
+
+class LatencyProbe:
+    # samples one endpoint several times after some warm-up calls and checks a percentile against a threshold
+    def __init__(self, client, samples=20, warmup=3, pct=95, thresholds=None, default_threshold_ms=300):
+        self.client = client
+        self.samples = samples
+        self.warmup = warmup
+        self.pct = pct
+        self.thresholds = thresholds or {}
+        self.default_threshold_ms = default_threshold_ms
+
+    def threshold_for(self, method, url):
+        # most specific wins: "PUT /posts/1", then "PUT", then the default
+        path = urlsplit(url).path
+        for key in (f"{method} {path}", method):
+            if key in self.thresholds:
+                return self.thresholds[key]
+        return self.default_threshold_ms
+
+    def measure(self, method, url, threshold_ms=None, **kwargs):
+        for _ in range(self.warmup):
+            self.client.request(method, url, cache=False, timed=False, **kwargs)
+        samples = []
+        response = None
+        for _ in range(self.samples):
+            response = self.client.request(method, url, cache=False, **kwargs)
+            samples.append(response.elapsed.total_seconds())
+        if threshold_ms is None:
+            threshold_ms = self.threshold_for(method, url)
+        return LatencyResult(method, url, samples, response, self.pct, threshold_ms)
+
+
+def parse_thresholds(values):
+    # ["GET=300", "PUT /posts/1=400"] -> {"GET": 300.0, "PUT /posts/1": 400.0}
+    thresholds = {}
+    for value in values:
+        key, _, ms = value.rpartition("=")
+        method, _, path = key.strip().partition(" ")
+        if not method:
+            raise ValueError(f"{value!r} is not METHOD[ PATH]=MS")
+        try:
+            limit = float(ms)
+        except ValueError:
+            raise ValueError(f"{value!r}: {ms!r} is not a number of milliseconds") from None
+        if not limit > 0:
+            raise ValueError(f"{value!r}: the threshold must be more than 0ms")
+        key = f"{method.upper()} {path.strip()}" if path.strip() else method.upper()
+        thresholds[key] = limit
+    return thresholds
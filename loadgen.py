@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import threading
+import time
+
+from api_client import ApiClient
+from endpoints import DEFAULT_BASE_URL
+from latency import summarize
+from mock_server import MockApiServer
+from test_api import RECORD_SPECS, SHARED_SPECS
+
+# drives the same endpoints as test_api.py at a fixed concurrency / target rate
+# python loadgen.py --api-url mock --concurrency 16 --rps 200 --duration 10
+
+
+class LoadRun:
+    def __init__(self, client, requests, rps, duration):
+        self.client = client
+        self.requests = requests
+        self.interval = 1 / rps if rps else 0
+        self.duration = duration
+        self.results = {method: [] for method, _, _ in requests}
+        self.errors = {method: 0 for method, _, _ in requests}
+        # requests that raised instead of returning a response, counted in errors too
+        self.exceptions = {method: 0 for method, _, _ in requests}
+        self._sent = 0
+        self._lock = threading.Lock()
+
+    def next_request(self):
+        # hands out requests round robin and returns when the next one may go out
+        with self._lock:
+            index = self._sent
+            self._sent += 1
+        return self.requests[index % len(self.requests)], self.start + index * self.interval
+
+    def worker(self):
+        while True:
+            (method, url, kwargs), due = self.next_request()
+            now = time.perf_counter()
+            if due >= self.deadline or now >= self.deadline:
+                return
+            if due > now:
+                time.sleep(due - now)
+            began = time.perf_counter()
+            try:
+                failed = self.client.request(method, url, cache=False, **kwargs).status_code >= 400
+            except Exception:
+                # no response, so no latency sample: a timeout or refused connection would skew the percentiles
+                with self._lock:
+                    self.errors[method] += 1
+                    self.exceptions[method] += 1
+                continue
+            elapsed = time.perf_counter() - began
+            with self._lock:
+                self.results[method].append(elapsed)
+                if failed:
+                    self.errors[method] += 1
+
+    def run(self, concurrency):
+        self.start = time.perf_counter()
+        self.deadline = self.start + self.duration
+        threads = [threading.Thread(target=self.worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.wall = time.perf_counter() - self.start
+
+    def report(self):
+        rows = {}
+        for method, samples in self.results.items():
+            # throughput and latency only cover requests that got a response
+            count = len(samples) + self.exceptions[method]
+            row = {"requests": count, "throughput": len(samples) / self.wall,
+                   "error_rate": self.errors[method] / count if count else 0.0, "exceptions": self.exceptions[method]}
+            row.update({name: value * 1000 for name, value in summarize(samples).items()})
+            rows[method] = row
+        return rows
+
+
+def print_report(rows):
+    print(f"{'method':<8}{'requests':>10}{'req/s':>10}{'errors':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for method, row in rows.items():
+        print(f"{method:<8}{row['requests']:>10}{row['throughput']:>10.1f}{row['error_rate']:>9.1%}"
+              f"{row['p50']:>10.1f}{row['p90']:>10.1f}{row['p99']:>10.1f}{row['max']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="load test the endpoints exercised by test_api.py")
+    parser.add_argument("--api-url", default=os.environ.get("API_BASE_URL", DEFAULT_BASE_URL),
+                        help="API root, 'mock' starts the bundled local server")
+    parser.add_argument("--resources", default="posts")
+    parser.add_argument("--post-id", type=int, default=1)
+    parser.add_argument("--methods", default="GET,POST,PUT,DELETE", help="comma separated verbs to include")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rps", type=float, default=0, help="target requests per second, 0 means as fast as possible")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to run")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.api_url.rstrip("/")
+    if base_url == "mock":
+        server = MockApiServer().start()
+        base_url = server.url
+    with open("test_data.json", "r") as file:
+        post_data = json.load(file)[0]
+    methods = {method.strip().upper() for method in args.methods.split(",")}
+    # built from test_api.py's specs, so the load matches what the tests send
+    specs = [spec for spec in SHARED_SPECS + RECORD_SPECS if spec.method in methods]
+    requests = [spec.request(base_url, post_data, resources=args.resources, post_id=args.post_id) for spec in specs]
+
+    # no retries, caching, pacing or circuit breaking, every request has to reach the API
+    client = ApiClient(pool_size=args.concurrency, retries=0, cache_size=0, rate_limit=0, breaker_threshold=0)
+    load = LoadRun(client, requests, args.rps, args.duration)
+    try:
+        load.run(args.concurrency)
+    finally:
+        client.close()
+        if server is not None:
+            server.stop()
+
+    rows = load.report()
+    print_report(rows)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(rows, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# local stand-in for https://jsonplaceholder.typicode.com/posts
+# GET /posts (with json-server's _page/_limit paging), GET/PUT/DELETE /posts/{id}, POST /posts,
+# nothing is persisted (same as jsonplaceholder)
+
+POST_COUNT = 100
+
+# the GET POST BY ID tests assert on jsonplaceholder's real post 1, so it is pinned here
+FIRST_POST = {
+    "userId": 1,
+    "id": 1,
+    "title": "sunt aut facere repellat provident occaecati excepturi optio reprehenderit",
+    "body": "quia et suscipit\nsuscipit recusandae consequuntur expedita et cum\n"
+            "reprehenderit molestiae ut ut quas totam\nnostrum rerum est autem sunt rem eveniet architecto",
+}
+
+ITEM_PATH = re.compile(r"^/(\w+)/(\d+)$")
+COLLECTION_PATH = re.compile(r"^/(\w+)$")
+
+
+def seed_posts(seed_file="test_data.json", count=POST_COUNT):
+    with open(seed_file, "r") as file:
+        records = json.load(file)
+    posts = [FIRST_POST]
+    for post_id in range(2, count + 1):
+        record = records[(post_id - 1) % len(records)]
+        posts.append({
+            "userId": (post_id - 1) // 10 + 1,
+            "id": post_id,
+            "title": record["title"],
+            "body": record["body"],
+        })
+    return posts
+
+
+class MockApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body go out in separate writes, without this every response waits on delayed ACK
+    disable_nagle_algorithm = True
+    resource = "posts"
+    posts = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def route(self):
+        # (is_collection, post_id) or None when the path is not ours
+        path = self.path.split("?", 1)[0]
+        match = COLLECTION_PATH.match(path)
+        if match and match.group(1) == self.resource:
+            return True, None
+        match = ITEM_PATH.match(path)
+        if match and match.group(1) == self.resource:
+            return False, int(match.group(2))
+        return None
+
+    def page(self, items):
+        query = parse_qs(urlsplit(self.path).query)
+        if "_page" not in query and "_limit" not in query:
+            return items
+        limit = int(query.get("_limit", ["10"])[0])
+        page = int(query.get("_page", ["1"])[0])
+        return items[(page - 1) * limit:page * limit]
+
+    def find_post(self, post_id):
+        if 1 <= post_id <= len(self.posts):
+            return self.posts[post_id - 1]
+        return None
+
+    def do_GET(self):
+        route = self.route()
+        if route is None:
+            return self.send_json(404, {})
+        is_collection, post_id = route
+        if is_collection:
+            return self.send_json(200, self.page(self.posts))
+        post = self.find_post(post_id)
+        if post is None:
+            return self.send_json(404, {})
+        self.send_json(200, post)
+
+    def do_POST(self):
+        route = self.route()
+        if route is None or not route[0]:
+            return self.send_json(404, {})
+        self.send_json(201, {**self.read_json(), "id": len(self.posts) + 1})
+
+    def do_PUT(self):
+        route = self.route()
+        if route is None or route[0]:
+            return self.send_json(404, {})
+        data = self.read_json()
+        if self.find_post(route[1]) is None:
+            return self.send_json(500, {})
+        self.send_json(200, {**data, "id": route[1]})
+
+    def do_DELETE(self):
+        route = self.route()
+        if route is None or route[0]:
+            return self.send_json(404, {})
+        self.send_json(200, {})
+
+
+class MockApiServer:
+    def __init__(self, host="127.0.0.1", port=0, seed_file="test_data.json"):
+        handler = type("Handler", (MockApiHandler,), {"posts": seed_posts(seed_file)})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="serve a local copy of the jsonplaceholder /posts API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--seed", default="test_data.json")
+    args = parser.parse_args()
+    server = MockApiServer(args.host, args.port, args.seed)
+    print(f"serving {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
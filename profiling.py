@@ -0,0 +1,103 @@
+import cProfile
+import os
+import re
+import sys
+import threading
+from collections import Counter
+
+import pytest
+
+# --profile-tests DIR: one profile per test covering fixture setup and the test call,
+# "cprofile" writes DIR/<test>.prof (snakeviz, pstats), "sample" writes DIR/<test>.folded
+# (collapsed stacks for flamegraph.pl / speedscope), the path is kept with the test's results
+
+MODES = ("cprofile", "sample")
+
+
+def profile_name(nodeid):
+    return re.sub(r"[^\w.-]+", "_", nodeid).strip("_")
+
+
+class StackSampler:
+    # samples the stack of the thread that started it every interval seconds, far less
+    # overhead than cProfile on call heavy code, but only shows where time is spent
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.stacks = Counter()
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _frames(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self.stacks[self._frames(frame)] += 1
+
+    def enable(self):
+        self._thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def disable(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump_stats(self, path):
+        with open(path, "w") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+
+class TestProfiler:
+    # plugin registered by conftest when --profile-tests is given, every xdist worker profiles its own tests
+    def __init__(self, directory, mode="cprofile", interval=0.001):
+        if mode not in MODES:
+            raise ValueError(f"unknown profile mode {mode!r}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.mode = mode
+        self.interval = interval
+        self._profiles = {}
+
+    def _profiler(self, item):
+        if item.nodeid not in self._profiles:
+            self._profiles[item.nodeid] = cProfile.Profile() if self.mode == "cprofile" else StackSampler(self.interval)
+        return self._profiles[item.nodeid]
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_setup(self, item):
+        profiler = self._profiler(item)
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_call(self, item):
+        profiler = self._profiler(item)
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            # written before the call report is made so the path ends up in it
+            ext = ".prof" if self.mode == "cprofile" else ".folded"
+            path = os.path.join(self.directory, profile_name(item.nodeid) + ext)
+            profiler.dump_stats(path)
+            item.user_properties.append(("profile", path))
+            del self._profiles[item.nodeid]
+
+    def pytest_runtest_logfinish(self, nodeid):
+        # a test whose setup failed never reaches the call phase
+        self._profiles.pop(nodeid, None)
@@ -0,0 +1,173 @@
+import argparse
+import html
+import math
+import os
+import sqlite3
+
+from api_client import PHASES
+
+# results streamed into a sqlite file as tests finish, then rendered as a small summary
+# page (per endpoint pass rate and latency) plus fixed size detail pages, so the browser
+# never has to load every row at once
+# python report.py summary_report/ re-renders from an existing results.sqlite
+
+DB_NAME = "results.sqlite"
+PAGE_SIZE = 500
+BATCH_SIZE = 500
+
+COLUMNS = ("nodeid", "outcome", "duration_ms", "method", "endpoint", "status", "request_id", "total_ms") + tuple(f"{phase}_ms" for phase in PHASES) + ("profile",)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS results (
+    seq INTEGER PRIMARY KEY,
+    nodeid TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    duration_ms REAL,
+    method TEXT,
+    endpoint TEXT,
+    status INTEGER,
+    request_id TEXT,
+    total_ms REAL,
+    {", ".join(f"{phase}_ms REAL" for phase in PHASES)},
+    profile TEXT
+);
+CREATE INDEX IF NOT EXISTS results_endpoint ON results (method, endpoint);
+-- one row per response, however many tests read it: endpoint latency is worked out from these
+CREATE TABLE IF NOT EXISTS requests (
+    request_id TEXT PRIMARY KEY,
+    method TEXT,
+    endpoint TEXT,
+    total_ms REAL
+);
+CREATE INDEX IF NOT EXISTS requests_endpoint ON requests (method, endpoint, total_ms);
+"""
+
+
+def outcome_of(report):
+    if hasattr(report, "wasxfail"):
+        return "xpassed" if report.passed else "xfailed"
+    if report.when != "call" and report.failed:
+        return "error"
+    return report.outcome
+
+
+class ReportWriter:
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        path = os.path.join(directory, DB_NAME)
+        if os.path.exists(path):
+            os.remove(path)
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self._rows = []
+        self._requests = []
+
+    # registered as a plugin on the controller, xdist replays the workers' reports there
+    def pytest_runtest_logreport(self, report):
+        # one row per test: the call report, or setup when the test never got that far
+        if report.when == "teardown" or (report.when == "setup" and report.passed):
+            return
+        properties = dict(report.user_properties)
+        method, endpoint, status, request_id = properties.get("request", (None, None, None, None))
+        timings = properties.get("timings", {})
+        self._rows.append((report.nodeid, outcome_of(report), report.duration * 1000, method, endpoint, status,
+                           request_id, timings.get("total"), *(timings.get(phase) for phase in PHASES),
+                           properties.get("profile")))
+        if request_id is not None:
+            self._requests.append((request_id, method, endpoint, timings.get("total")))
+        if len(self._rows) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self._rows:
+            with self.db:
+                self.db.executemany(
+                    f"INSERT INTO results ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", self._rows)
+                self.db.executemany("INSERT OR IGNORE INTO requests VALUES (?, ?, ?, ?)", self._requests)
+            self._rows.clear()
+            self._requests.clear()
+
+    def close(self):
+        self.flush()
+        self.db.close()
+        render(self.directory)
+
+
+def percentile_of(db, method, endpoint, count, pct):
+    # nearest rank read through the index, nothing but one value is loaded
+    offset = max(math.ceil(count * pct / 100) - 1, 0)
+    row = db.execute("SELECT total_ms FROM requests WHERE method IS ? AND endpoint IS ? AND total_ms IS NOT NULL "
+                     "ORDER BY total_ms LIMIT 1 OFFSET ?", (method, endpoint, offset)).fetchone()
+    return row[0] if row else None
+
+
+def fmt(value, digits=1):
+    if value is None:
+        return ""
+    return f"{value:.{digits}f}" if isinstance(value, float) else html.escape(str(value))
+
+
+def page_name(number):
+    return f"page-{number:05d}.html"
+
+
+PAGE_START = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"/><title>{title}</title>
+<style>body{{font-family:sans-serif}} table{{border-collapse:collapse}} td,th{{border:1px solid #ccc;padding:2px 6px}}
+.failed,.error{{background:#fdd}} .passed{{background:#dfd}} .xfailed,.skipped,.xpassed{{background:#ffd}}</style>
+</head><body><h1>{title}</h1>
+"""
+
+
+def render(directory, page_size=PAGE_SIZE):
+    db = sqlite3.connect(os.path.join(directory, DB_NAME))
+    total = db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+    pages = max(math.ceil(total / page_size), 1)
+
+    with open(os.path.join(directory, "index.html"), "w", encoding="utf-8") as out:
+        out.write(PAGE_START.format(title="API test summary"))
+        out.write("<table><tr><th>outcome</th><th>tests</th></tr>")
+        for outcome, count in db.execute("SELECT outcome, COUNT(*) FROM results GROUP BY outcome ORDER BY outcome"):
+            out.write(f'<tr class="{outcome}"><td>{outcome}</td><td>{count}</td></tr>')
+        out.write(f"<tr><th>total</th><th>{total}</th></tr></table>\n<h2>per endpoint</h2>\n")
+        out.write("<table><tr><th>method</th><th>endpoint</th><th>tests</th><th>passed</th><th>pass rate</th>"
+                  "<th>requests</th><th>mean ms</th><th>p50 ms</th><th>p95 ms</th><th>max ms</th></tr>")
+        # pass rate per test, latency per request: the checks sharing a response count it once
+        groups = db.execute(
+            "SELECT method, endpoint, COUNT(*), SUM(outcome IN ('passed', 'xfailed')) "
+            "FROM results GROUP BY method, endpoint ORDER BY endpoint, method").fetchall()
+        for method, endpoint, count, passed in groups:
+            requests, timed, mean, slowest = db.execute(
+                "SELECT COUNT(*), COUNT(total_ms), AVG(total_ms), MAX(total_ms) FROM requests "
+                "WHERE method IS ? AND endpoint IS ?", (method, endpoint)).fetchone()
+            p50 = percentile_of(db, method, endpoint, timed, 50)
+            p95 = percentile_of(db, method, endpoint, timed, 95)
+            out.write(f"<tr><td>{fmt(method)}</td><td>{fmt(endpoint) or 'no request'}</td><td>{count}</td><td>{passed}</td>"
+                      f"<td>{passed / count:.1%}</td><td>{requests}</td><td>{fmt(mean)}</td><td>{fmt(p50)}</td>"
+                      f"<td>{fmt(p95)}</td><td>{fmt(slowest)}</td></tr>")
+        out.write(f'</table>\n<p><a href="{page_name(1)}">all {total} results</a> ({pages} pages)</p></body></html>\n')
+
+    header = "".join(f"<th>{column}</th>" for column in COLUMNS)
+    rows = db.execute(f"SELECT {', '.join(COLUMNS)} FROM results ORDER BY seq")
+    for number in range(1, pages + 1):
+        with open(os.path.join(directory, page_name(number)), "w", encoding="utf-8") as out:
+            out.write(PAGE_START.format(title=f"results page {number} of {pages}"))
+            links = ['<a href="index.html">summary</a>']
+            if number > 1:
+                links.append(f'<a href="{page_name(number - 1)}">previous</a>')
+            if number < pages:
+                links.append(f'<a href="{page_name(number + 1)}">next</a>')
+            out.write(f"<p>{' | '.join(links)}</p>\n<table><tr>{header}</tr>\n")
+            for row in rows.fetchmany(page_size):
+                out.write(f'<tr class="{row[1]}">' + "".join(f"<td>{fmt(value)}</td>" for value in row) + "</tr>\n")
+            out.write("</table></body></html>\n")
+    db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="render the summary report from a results.sqlite")
+    parser.add_argument("directory")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    args = parser.parse_args()
+    render(args.directory, args.page_size)
@@ -0,0 +1,126 @@
+import csv
+import glob
+import os
+import threading
+import time
+
+RESULT_FILE = "result_api.csv"
+RESULT_HEADER = ["Test Name", "Method", "Endpoint", "Status Code", "Result", "Message",
+                 "DNS ms", "Connect ms", "TLS ms", "TTFB ms", "Download ms", "JSON ms"]
+SAMPLES_FILE = "latency_samples.csv"
+SAMPLES_HEADER = ["Test Name", "Method", "Endpoint", "Sample", "Elapsed ms"]
+# every file written through a sink, so the controller knows which shards to merge
+RESULT_FILES = {RESULT_FILE: RESULT_HEADER, SAMPLES_FILE: SAMPLES_HEADER}
+
+
+# position of the running test in collection order, shard rows carry it so
+# the merged file comes out in the same order as a serial run
+_test_index = 0
+
+
+def set_test_index(index):
+    global _test_index
+    _test_index = index
+
+
+def shard_path(filename, worker):
+    root, ext = os.path.splitext(filename)
+    return f"{root}.{worker}{ext}"
+
+
+def start_file(filename, header):
+    # True when the header still has to be written, a file started with a different
+    # header (columns added since) is moved aside to <name>.<its date><ext> first
+    if not os.path.exists(filename):
+        return True
+    with open(filename, newline="") as file:
+        existing = next(csv.reader(file), None)
+    if existing == list(header):
+        return False
+    root, ext = os.path.splitext(filename)
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(os.path.getmtime(filename)))
+    os.replace(filename, f"{root}.{stamp}{ext}")
+    return True
+
+
+class ResultSink:
+    # keeps rows in memory and appends them to the csv in batches,
+    # each xdist worker writes its own shard which is merged at the end of the run
+    def __init__(self, filename, header, batch_size=50):
+        self.filename = filename
+        self.header = header
+        self.batch_size = batch_size
+        self.worker = os.environ.get("PYTEST_XDIST_WORKER")
+        self.path = shard_path(filename, self.worker) if self.worker else filename
+        self._rows = []
+        self._lock = threading.Lock()
+        self._started = False
+        if self.worker and os.path.exists(self.path):
+            # leftover from a run that died before merging
+            os.remove(self.path)
+
+    def write(self, row):
+        if self.worker:
+            row = [_test_index, *row]
+        with self._lock:
+            self._rows.append(row)
+            if len(self._rows) >= self.batch_size:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._rows:
+            return
+        write_header = False
+        if self.worker is None and not self._started:
+            write_header = start_file(self.path, self.header)
+            self._started = True
+        with open(self.path, mode="a", newline="") as file:
+            writer = csv.writer(file)
+            if write_header:
+                writer.writerow(self.header)
+            writer.writerows(self._rows)
+        self._rows.clear()
+
+
+def merge_shards(filename, header):
+    shards = sorted(glob.glob(shard_path(filename, "gw*")))
+    if not shards:
+        return
+    rows = []
+    for shard in shards:
+        with open(shard, newline="") as file:
+            rows.extend(csv.reader(file))
+    # stable sort, rows of the same test keep the order they were logged in
+    rows.sort(key=lambda row: int(row[0]))
+    write_header = start_file(filename, header)
+    with open(filename, mode="a", newline="") as out:
+        writer = csv.writer(out)
+        if write_header:
+            writer.writerow(header)
+        writer.writerows(row[1:] for row in rows)
+    for shard in shards:
+        os.remove(shard)
+
+
+_sinks = {}
+
+
+def get_sink(filename=RESULT_FILE, header=RESULT_HEADER):
+    sink = _sinks.get(filename)
+    if sink is None:
+        sink = _sinks[filename] = ResultSink(filename, header)
+    return sink
+
+
+def close_sinks():
+    for sink in _sinks.values():
+        sink.flush()
+
+
+def merge_all():
+    for filename, header in RESULT_FILES.items():
+        merge_shards(filename, header)
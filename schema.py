@@ -0,0 +1,34 @@
+from operator import itemgetter
+
+# compiled validators for resource payloads and whole-list helpers for the GET ALL checks
+
+POST_SCHEMA = {"userId": int, "id": int, "title": str, "body": str}
+
+
+def compile_schema(schema):
+    # builds one flat boolean expression per schema, e.g.
+    # type(item) is dict and type(item.get("id")) is int and ...
+    # type() is used instead of isinstance so True doesn't pass as an int
+    names = {f"t{index}": field_type for index, field_type in enumerate(schema.values())}
+    terms = ["type(item) is dict"] + [
+        f"type(item.get({field!r})) is t{index}" for index, field in enumerate(schema)
+    ]
+    source = f"def validate(item):\n    return {' and '.join(terms)}\n"
+    namespace = dict(names)
+    exec(source, namespace)
+    return namespace["validate"]
+
+
+validate_post = compile_schema(POST_SCHEMA)
+
+
+def first_invalid(items, validate):
+    # index of the first item that fails, -1 when all pass
+    if all(map(validate, items)):
+        return -1
+    return next(index for index, item in enumerate(items) if not validate(item))
+
+
+def ids_sequential(items, key="id"):
+    ids = list(map(itemgetter(key), items))
+    return not ids or ids == list(range(ids[0], ids[0] + len(ids)))
@@ -0,0 +1,83 @@
+import json_codec
+from dataset import ArrayScanner
+
+# collection assertions with bounded memory: elements are decoded one at a time straight
+# off the socket, or fetched page by page with json-server's _page/_limit parameters
+
+CHUNK_SIZE = 1 << 14
+
+
+class PageLimitError(RuntimeError):
+    # iter_pages gave up, the collection was not read to its end
+    pass
+
+
+def iter_json_array(chunks):
+    # only the element being read (plus one chunk) is ever buffered
+    scanner = ArrayScanner()
+    buffer = bytearray()
+    base = 0
+    for chunk in chunks:
+        buffer += chunk
+        for start, end in scanner.feed(chunk):
+            yield json_codec.loads(bytes(buffer[start - base:end - base]))
+        keep = scanner.start if scanner.start is not None else scanner.position
+        del buffer[:keep - base]
+        base = keep
+    if not scanner.opened:
+        raise ValueError("not a JSON array")
+    if scanner.depth != 0:
+        raise ValueError("JSON array ended early")
+
+
+def stream_items(client, url):
+    # response is returned too so the caller can log its status and timings
+    response = client.request("GET", url, cache=False, stream=True)
+    response.raise_for_status()
+    return response, iter_json_array(response.iter_content(CHUNK_SIZE))
+
+
+def iter_pages(client, url, limit=20, max_pages=10000):
+    # walks ?_page=1&_limit=limit, ?_page=2... until a short or empty page,
+    # a server that ignores the parameters answers with the whole collection, which ends it too
+    for page in range(1, max_pages + 1):
+        response = client.request("GET", url, cache=False, params={"_page": page, "_limit": limit})
+        response.raise_for_status()
+        items = response.json()
+        if not isinstance(items, list):
+            raise ValueError(f"page {page} of {url} is not a JSON array")
+        yield from items
+        if len(items) != limit:
+            return
+    raise PageLimitError(f"{url} still had items after {max_pages} pages of {limit}")
+
+
+class CollectionStats:
+    # count, non-empty and id ordering worked out while the items go by
+    def __init__(self, key="id"):
+        self.key = key
+        self.count = 0
+        self.sequential = True
+        self.is_array = True
+        self._last = None
+
+    def consume(self, items):
+        try:
+            for item in items:
+                self.count += 1
+                try:
+                    value = item[self.key]
+                    if self._last is not None and value != self._last + 1:
+                        self.sequential = False
+                except (TypeError, KeyError):
+                    # not an object or no key: still an element, but nothing to order by
+                    value = None
+                    self.sequential = False
+                self._last = value
+        except ValueError:
+            self.is_array = False
+        return self
+
+    @property
+    def not_empty(self):
+        return self.count > 0
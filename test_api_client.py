@@ -0,0 +1,115 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from api_client import ApiClient
+from throttle import CircuitOpenError
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    # answers every request with the server's status (and Retry-After when set), counting hits
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def respond(self):
+        self.server.hits += 1
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        self.send_response(self.server.status)
+        if self.server.retry_after is not None:
+            self.send_header("Retry-After", str(self.server.retry_after))
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_GET = do_POST = do_PUT = do_DELETE = respond
+
+
+@pytest.fixture()
+def status_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StatusHandler)
+    server.daemon_threads = True
+    server.hits = 0
+    server.status = 503
+    server.retry_after = 2
+    threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def url_of(server):
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/posts"
+
+
+# RETRIES
+
+def test_retries_are_bounded_and_retry_after_capped(status_server):
+    client = ApiClient(retries=3, backoff_factor=0, retry_after_max=0.05, breaker_threshold=0)
+    started = time.monotonic()
+    response = client.get(url_of(status_server), cache=False)
+    assert response.status_code == 503
+    assert status_server.hits == 4
+    # three waits of at most retry_after_max, not the server's 2 seconds each
+    assert time.monotonic() - started < 1
+    client.close()
+
+def test_non_idempotent_requests_are_not_retried(status_server):
+    client = ApiClient(retries=3, backoff_factor=0, retry_after_max=0.05, breaker_threshold=0)
+    assert client.post(url_of(status_server), json={}).status_code == 503
+    assert status_server.hits == 1
+    client.close()
+
+def test_success_is_not_retried(status_server):
+    status_server.status = 200
+    client = ApiClient(retries=3, backoff_factor=0)
+    assert client.get(url_of(status_server), cache=False).status_code == 200
+    assert status_server.hits == 1
+    client.close()
+
+def test_breaker_sees_every_attempt(status_server):
+    client = ApiClient(retries=3, backoff_factor=0, retry_after_max=0.01, breaker_threshold=10)
+    client.get(url_of(status_server), cache=False)
+    host = url_of(status_server).split("/")[2]
+    assert client.guard.breakers[host].failures == 4
+    client.close()
+
+def test_breaker_stops_retries_once_open(status_server):
+    client = ApiClient(retries=5, backoff_factor=0, retry_after_max=0.01, breaker_threshold=2, breaker_cooldown=60)
+    with pytest.raises(CircuitOpenError):
+        client.get(url_of(status_server), cache=False)
+    assert status_server.hits == 2
+    client.close()
+
+def test_connection_errors_are_retried_and_counted():
+    client = ApiClient(retries=2, backoff_factor=0, breaker_threshold=10)
+    with pytest.raises(Exception):
+        client.get("http://127.0.0.1:9/posts", cache=False)
+    assert client.guard.breakers["127.0.0.1:9"].failures == 3
+    client.close()
+
+
+# TIMINGS
+
+def test_timings_keep_the_query_and_skip_untimed_requests(status_server):
+    status_server.status = 200
+    status_server.retry_after = None
+    client = ApiClient(record_timings=True, breaker_threshold=0)
+    client.get(url_of(status_server), cache=False, timed=False)
+    client.get(url_of(status_server), cache=False, params={"_page": 2, "_limit": 20})
+    client.get(url_of(status_server), cache=False)
+    assert [(method, endpoint) for _, method, endpoint, _, _ in client.timings] == [
+        ("GET", "/posts?_page=2&_limit=20"), ("GET", "/posts")]
+    client.close()
+
+def test_plain_http_has_no_tls_phase(status_server):
+    status_server.status = 200
+    status_server.retry_after = None
+    client = ApiClient(breaker_threshold=0)
+    timings = client.get(url_of(status_server), cache=False).timings
+    assert "tls" not in timings
+    assert {"dns", "connect", "ttfb", "total"} <= timings.keys()
+    client.close()
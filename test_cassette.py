@@ -0,0 +1,94 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from api_client import ApiClient
+from cassette import Cassette, CassetteMiss, build_response, merge_shards
+from mock_server import MockApiServer
+from result_sink import shard_path
+
+SEED_FILE = os.path.join(os.path.dirname(__file__), "test_data.json")
+
+
+@pytest.fixture()
+def cassette_path(tmp_path, monkeypatch):
+    # under xdist the cassette would save a worker shard instead
+    monkeypatch.delenv("PYTEST_XDIST_WORKER", raising=False)
+    return str(tmp_path / "api.jsonl.gz")
+
+@pytest.fixture(scope="module")
+def server():
+    server = MockApiServer(seed_file=SEED_FILE).start()
+    yield server
+    server.stop()
+
+def fake_response(body, status=200):
+    return build_response({"status": status, "url": "http://recorded/posts/1", "headers": {}, "body": body,
+                           "elapsed": 0.01, "timings": {"total": 10.0}})
+
+def saved_keys(path):
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        return [json.loads(line)["key"] for line in file]
+
+
+def test_round_trip_ignores_the_host(server, cassette_path):
+    client = ApiClient(cassette=Cassette(cassette_path, "record"), breaker_threshold=0)
+    sent = client.get(f"{server.url}/posts/1", cache=False)
+    created = client.post(f"{server.url}/posts", json={"title": "t", "body": "b", "userId": 1})
+    client.cassette.save()
+    client.close()
+
+    # nothing listens there, every answer has to come from the cassette
+    client = ApiClient(cassette=Cassette(cassette_path, "replay"), breaker_threshold=0)
+    replayed = client.get("http://replay.invalid/posts/1", cache=False)
+    assert replayed.replayed
+    assert (replayed.status_code, replayed.json()) == (sent.status_code, sent.json())
+    assert client.post("http://replay.invalid/posts", json={"title": "t", "body": "b", "userId": 1}).json() == created.json()
+    assert client.cassette.hits == 2
+    client.close()
+
+def test_strict_replay_raises_on_miss(cassette_path):
+    client = ApiClient(cassette=Cassette(cassette_path, "replay"), breaker_threshold=0)
+    with pytest.raises(CassetteMiss):
+        client.get("http://replay.invalid/posts/2", cache=False)
+    assert client.cassette.misses == 1
+    client.close()
+
+def test_repeated_requests_replay_in_turn(cassette_path):
+    recorder = Cassette(cassette_path, "record")
+    for body in ("[1]", "[2]"):
+        recorder.record("GET /posts", "GET", fake_response(body))
+    recorder.save()
+    player = Cassette(cassette_path, "replay")
+    assert [player.play("GET /posts").json() for _ in range(3)] == [[1], [2], [1]]
+
+def test_auto_appends_and_record_overwrites(cassette_path):
+    recorder = Cassette(cassette_path, "record")
+    recorder.record("first", "GET", fake_response("{}"))
+    recorder.save()
+    auto = Cassette(cassette_path, "auto")
+    assert auto.play("missing") is None
+    auto.record("second", "GET", fake_response("{}"))
+    auto.save()
+    assert saved_keys(cassette_path) == ["first", "second"]
+    recorder = Cassette(cassette_path, "record")
+    recorder.record("third", "GET", fake_response("{}"))
+    recorder.save()
+    assert saved_keys(cassette_path) == ["third"]
+
+@pytest.mark.parametrize("overwrite,expected", [(True, ["gw0", "gw1"]), (False, ["old", "gw0", "gw1"])])
+def test_merge_shards(cassette_path, overwrite, expected):
+    # record mode replaces the cassette with the workers' shards, auto appends them
+    saver = Cassette(cassette_path, "record")
+    saver.record("old", "GET", fake_response("{}"))
+    saver.save()
+    for worker in ("gw1", "gw0"):
+        shard = Cassette(cassette_path, "record")
+        shard.worker = worker
+        shard.record(worker, "GET", fake_response("{}"))
+        shard.save()
+    merge_shards(cassette_path, overwrite)
+    assert saved_keys(cassette_path) == expected
+    assert not os.path.exists(shard_path(cassette_path, "gw0"))
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from dataset import ArrayScanner, RecordIndex
+
+
+def spans(data, chunk_size):
+    # every element of data as text, fed chunk_size bytes at a time
+    scanner = ArrayScanner()
+    found = []
+    for offset in range(0, len(data), chunk_size):
+        found += scanner.feed(data[offset:offset + chunk_size])
+    return [data[start:end].decode() for start, end in found], scanner
+
+DOCUMENTS = [
+    [],
+    [{"a": 1}, {"b": [1, 2, {"c": "]"}]}],
+    ["plain", 'with "quote"', "back\\slash", "ends with \\"],
+    [{"s": "}{][,,"}, [[], [[]]], "x"],
+    [{"nested": {"deep": {"deeper": ['\\"', "\u00e9"]}}}],
+    [1, 22, 333],
+    [True, None, -1.5e3, "s", {"a": 1}, 0, [], False],
+]
+
+# chunk sizes of 1 and 2 put every escape, quote and bracket on a chunk boundary
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1 << 16])
+@pytest.mark.parametrize("document", DOCUMENTS, ids=[f"doc{index}" for index in range(len(DOCUMENTS))])
+def test_scanner_finds_every_element(document, chunk_size):
+    data = json.dumps(document, indent=1).encode()
+    found, scanner = spans(data, chunk_size)
+    assert [json.loads(text) for text in found] == document
+    assert scanner.depth == 0
+
+def test_scanner_keeps_raw_escapes_in_strings():
+    data = rb'["a\\", "b\"]", "c\\\\"]'
+    found, _ = spans(data, 1)
+    assert [json.loads(text) for text in found] == ["a\\", 'b"]', "c\\\\"]
+
+def test_scanner_rejects_non_array():
+    with pytest.raises(ValueError, match="not a JSON array"):
+        ArrayScanner().feed(b'{"a": 1}')
+
+def test_scanner_reports_whether_the_array_opened():
+    scanner = ArrayScanner()
+    assert scanner.feed(b"null") == []
+    assert not scanner.opened
+    scanner = ArrayScanner()
+    assert scanner.feed(b" [ ] ") == []
+    assert scanner.opened and scanner.depth == 0
+
+def test_scanner_reports_open_element_across_chunks():
+    scanner = ArrayScanner()
+    assert scanner.feed(b'[{"a": ') == []
+    assert scanner.start == 1
+    assert scanner.feed(b'1}]') == [(1, 9)]
+    assert scanner.start is None
+
+
+@pytest.mark.parametrize("suffix,text", [(".json", '[{"id": 1}, {"id": 2}, {"id": 3}]'),
+                                         (".jsonl", '{"id": 1}\n\n{"id": 2}\n{"id": 3}\n')])
+def test_record_index_reads_records_on_demand(tmp_path, suffix, text):
+    path = tmp_path / f"records{suffix}"
+    path.write_text(text)
+    index = RecordIndex(str(path))
+    try:
+        assert len(index) == 3
+        assert index[1] == {"id": 2}
+        assert index[-1] == {"id": 3}
+        assert list(index) == [{"id": 1}, {"id": 2}, {"id": 3}]
+        with pytest.raises(IndexError):
+            index[3]
+    finally:
+        index.close()
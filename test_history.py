@@ -0,0 +1,18 @@
+import pytest
+
+from history import mann_whitney_greater
+
+
+# p values worked out by hand: U, the tie corrected variance, then the continuity corrected z
+# ([1, 2, 2, 3, 5] vs [2, 2, 4, 4, 6, 7]: U = 8, variance 2.5 * (12 - 66 / 110) = 28.5, z = -7.5 / sqrt(28.5))
+@pytest.mark.parametrize("current,baseline,expected", [
+    ([4, 5, 6], [1, 2, 3], 0.040428),
+    ([1, 2, 2, 3, 5], [2, 2, 4, 4, 6, 7], 0.919971),
+    ([1, 2, 3], [4, 5, 6], 0.985452),
+])
+def test_mann_whitney_greater_known_answers(current, baseline, expected):
+    assert mann_whitney_greater(current, baseline) == pytest.approx(expected, abs=1e-6)
+
+def test_mann_whitney_greater_all_tied():
+    # no variance left after the tie correction, nothing can be concluded
+    assert mann_whitney_greater([1, 1], [1, 1]) == 1.0
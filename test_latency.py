@@ -0,0 +1,40 @@
+import math
+
+import pytest
+
+from latency import LatencyStats, parse_thresholds, percentile, summarize
+
+
+@pytest.mark.parametrize("values,pct,expected", [
+    ([1, 2, 3, 4], 50, 2.5),
+    ([1, 2, 3, 4], 0, 1),
+    ([1, 2, 3, 4], 100, 4),
+    ([10, 20, 30, 40, 50], 90, 46.0),
+    ([7], 99, 7),
+])
+def test_percentile_interpolates_between_ranks(values, pct, expected):
+    assert percentile(values, pct) == pytest.approx(expected)
+
+def test_percentile_of_nothing_is_nan():
+    assert math.isnan(percentile([], 50))
+
+def test_summarize_sorts_first():
+    assert summarize([3, 1, 2], percentiles=(50,)) == {"p50": 2, "max": 3}
+
+# n = 100: n*q -+ 1.96*sqrt(n*q*(1-q)) gives 1-based ranks 40..60 for the median, 90..100 for p95
+@pytest.mark.parametrize("pct,expected", [(50, (40, 60)), (95, (90, 100)), (99, (97, 100))])
+def test_percentile_ci_order_statistics(pct, expected):
+    assert LatencyStats(range(1, 101)).percentile_ci(pct) == expected
+
+def test_percentile_ci_clamps_to_the_samples():
+    assert LatencyStats([5]).percentile_ci(95) == (5, 5)
+    assert LatencyStats([1, 2]).percentile_ci(50) == (1, 2)
+
+def test_parse_thresholds():
+    assert parse_thresholds(["get=300", "PUT /posts/1 = 400", "DELETE=1.5"]) == {
+        "GET": 300.0, "PUT /posts/1": 400.0, "DELETE": 1.5}
+
+@pytest.mark.parametrize("value", ["GET", "=300", "GET=fast", "GET=0", "GET=-5"])
+def test_parse_thresholds_rejects(value):
+    with pytest.raises(ValueError, match=value):
+        parse_thresholds([value])
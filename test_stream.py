@@ -0,0 +1,85 @@
+import pytest
+
+from stream import CollectionStats, PageLimitError, iter_json_array, iter_pages
+
+
+class FakeResponse:
+    def __init__(self, items):
+        self.items = items
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.items
+
+
+class PagedClient:
+    # serves `posts` by _page/_limit, or the whole list every time when ignore_paging is set
+    def __init__(self, posts, ignore_paging=False):
+        self.posts = posts
+        self.ignore_paging = ignore_paging
+        self.pages = []
+
+    def request(self, method, url, cache=None, params=None, **kwargs):
+        self.pages.append(params["_page"])
+        if self.ignore_paging:
+            return FakeResponse(self.posts)
+        limit = params["_limit"]
+        return FakeResponse(self.posts[(params["_page"] - 1) * limit:params["_page"] * limit])
+
+
+POSTS = [{"id": number} for number in range(1, 46)]
+
+def test_iter_pages_walks_until_short_page():
+    client = PagedClient(POSTS)
+    assert list(iter_pages(client, "/posts", limit=20)) == POSTS
+    assert client.pages == [1, 2, 3]
+
+def test_iter_pages_stops_on_empty_page():
+    client = PagedClient(POSTS[:40])
+    assert list(iter_pages(client, "/posts", limit=20)) == POSTS[:40]
+    assert client.pages == [1, 2, 3]
+
+def test_iter_pages_stops_when_server_ignores_paging():
+    client = PagedClient(POSTS, ignore_paging=True)
+    assert list(iter_pages(client, "/posts", limit=20)) == POSTS
+    assert client.pages == [1]
+
+def test_iter_pages_gives_up_after_max_pages():
+    client = PagedClient(POSTS[:20], ignore_paging=True)
+    with pytest.raises(PageLimitError, match="after 3 pages"):
+        list(iter_pages(client, "/posts", limit=20, max_pages=3))
+
+def test_iter_json_array_across_chunk_boundaries():
+    data = b'[{"id": 1, "title": "a, [b]"}, {"id": 2}, {"id": 3}]'
+    chunks = [data[offset:offset + 4] for offset in range(0, len(data), 4)]
+    stats = CollectionStats().consume(iter_json_array(chunks))
+    assert (stats.count, stats.sequential, stats.is_array) == (3, True, True)
+
+def test_iter_json_array_truncated():
+    with pytest.raises(ValueError, match="ended early"):
+        list(iter_json_array([b'[{"id": 1}, {"id"']))
+
+def test_iter_pages_rejects_object_page():
+    client = PagedClient({"id": 1}, ignore_paging=True)
+    stats = CollectionStats().consume(iter_pages(client, "/posts", limit=20))
+    assert (stats.count, stats.is_array) == (0, False)
+
+def test_page_limit_is_not_reported_as_non_array():
+    client = PagedClient(POSTS[:20], ignore_paging=True)
+    with pytest.raises(PageLimitError):
+        CollectionStats().consume(iter_pages(client, "/posts", limit=20, max_pages=3))
+
+@pytest.mark.parametrize("body", [b"null", b"", b"{}", b'"text"'])
+def test_iter_json_array_rejects_non_array_body(body):
+    stats = CollectionStats().consume(iter_json_array([body]))
+    assert (stats.count, stats.is_array) == (0, False)
+
+def test_iter_json_array_counts_scalars():
+    stats = CollectionStats().consume(iter_json_array([b"[1, 2,", b" 3]"]))
+    assert (stats.count, stats.sequential, stats.is_array) == (3, False, True)
+
+def test_items_without_key_fail_ordering():
+    stats = CollectionStats().consume(iter([{"id": 1}, {"title": "x"}, ["id"], {"id": 2}]))
+    assert (stats.count, stats.sequential, stats.is_array) == (4, False, True)
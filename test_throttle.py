@@ -0,0 +1,141 @@
+import pytest
+
+import throttle
+from throttle import CircuitBreaker, CircuitOpenError, TokenBucket
+
+
+# time is faked so the state machines can be stepped without sleeping
+class FakeTime:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(throttle, "time", fake)
+    return fake
+
+
+# TOKEN BUCKET
+
+def test_bucket_burst_goes_out_without_waiting(clock):
+    bucket = TokenBucket(rate=10, burst=3)
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.slept == []
+
+def test_bucket_paces_at_rate_after_burst(clock):
+    bucket = TokenBucket(rate=10, burst=1)
+    bucket.acquire()
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.slept == pytest.approx([0.1, 0.1])
+    assert bucket.waited == pytest.approx(0.2)
+
+def test_bucket_refills_up_to_burst_only(clock):
+    bucket = TokenBucket(rate=10, burst=2)
+    bucket.acquire()
+    bucket.acquire()
+    clock.now += 60
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.slept == []
+    bucket.acquire()
+    assert clock.slept == pytest.approx([0.1])
+
+def test_bucket_halves_rate_down_to_min_rate(clock):
+    bucket = TokenBucket(rate=8, min_rate=1)
+    bucket.slow_down()
+    assert bucket.rate == 4
+    for _ in range(5):
+        bucket.slow_down()
+    assert bucket.rate == 1
+
+def test_bucket_grows_back_additively_up_to_max_rate(clock):
+    bucket = TokenBucket(rate=4)
+    bucket.slow_down()
+    bucket.speed_up()
+    assert bucket.rate == pytest.approx(2.5)
+    for _ in range(100):
+        bucket.speed_up()
+    assert bucket.rate == 4
+
+def test_bucket_retry_after_holds_next_request_back(clock):
+    bucket = TokenBucket(rate=10, burst=5)
+    bucket.slow_down(retry_after=2)
+    bucket.acquire()
+    # rate halved to 5/s, the token debt covers the 2s the server asked for
+    assert clock.slept == pytest.approx([2.0])
+
+
+# CIRCUIT BREAKER
+
+def trip(breaker):
+    for _ in range(breaker.threshold):
+        breaker.failure()
+
+def test_breaker_stays_closed_below_threshold(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=10)
+    breaker.failure()
+    breaker.failure()
+    breaker.before("api")
+    assert breaker.opened == 0
+
+def test_breaker_success_resets_consecutive_failures(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=10)
+    breaker.failure()
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+    breaker.failure()
+    breaker.before("api")
+    assert breaker.opened == 0
+
+def test_breaker_opens_and_fails_fast(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=10)
+    trip(breaker)
+    with pytest.raises(CircuitOpenError, match="circuit open for api"):
+        breaker.before("api")
+    assert breaker.opened == 1
+    assert breaker.rejected == 1
+
+def test_breaker_lets_one_probe_through_after_cooldown(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=10)
+    trip(breaker)
+    clock.now += 10
+    breaker.before("api")
+    # the probe is still in flight, everyone else keeps failing fast
+    with pytest.raises(CircuitOpenError):
+        breaker.before("api")
+
+def test_breaker_probe_success_closes(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=10)
+    trip(breaker)
+    clock.now += 10
+    breaker.before("api")
+    breaker.success()
+    breaker.before("api")
+    breaker.before("api")
+    assert breaker.opened == 1
+
+def test_breaker_probe_failure_reopens_for_another_cooldown(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=10)
+    trip(breaker)
+    clock.now += 10
+    breaker.before("api")
+    breaker.failure()
+    assert breaker.opened == 2
+    clock.now += 5
+    with pytest.raises(CircuitOpenError):
+        breaker.before("api")
+    clock.now += 5
+    breaker.before("api")
@@ -0,0 +1,152 @@
+import threading
+import time
+
+import requests
+
+# per host request pacing and fast failure for a backend that is throttling or down,
+# ApiClient runs every attempt of its retry loop through here
+
+# statuses that mean "slow down" rather than "broken"
+THROTTLE_STATUSES = frozenset([429, 503])
+
+
+class CircuitOpenError(requests.ConnectionError):
+    # raised instead of sending while a host's breaker is open
+    pass
+
+
+class TokenBucket:
+    # rate tokens per second refilled up to burst, the rate adapts AIMD style:
+    # halved whenever the server throttles, raised by about one per second while it does not
+    def __init__(self, rate, burst=None, min_rate=0.5):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.burst = burst or max(rate, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            # take the token now and sleep off the debt outside the lock, callers queue up in order
+            self.tokens -= 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.waited += delay
+        if delay:
+            time.sleep(delay)
+
+    def slow_down(self, retry_after=None):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            if retry_after:
+                # nothing goes out before the server said it is ready again
+                self.tokens = min(self.tokens, 1 - retry_after * self.rate)
+
+    def speed_up(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = min(self.max_rate, self.rate + 1 / self.rate)
+
+
+class CircuitBreaker:
+    # opens after threshold consecutive failures, fast fails for cooldown seconds,
+    # then lets a single probe through: success closes it, failure opens it again
+    def __init__(self, threshold=5, cooldown=30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.opened = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def before(self, host):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            remaining = self.opened_at + self.cooldown - time.monotonic()
+            if remaining <= 0 and not self.probing:
+                self.probing = True
+                return
+            self.rejected += 1
+        raise CircuitOpenError(f"circuit open for {host} after {self.threshold} consecutive failures, "
+                               f"not sending (retry in {max(remaining, 0):.1f}s)")
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or (self.opened_at is None and self.failures >= self.threshold):
+                self.opened_at = time.monotonic()
+                self.opened += 1
+            self.probing = False
+
+
+class HostGuard:
+    # a token bucket (rate > 0) and a breaker (threshold > 0) per host, both optional
+    def __init__(self, rate=0.0, burst=None, threshold=5, cooldown=30.0):
+        self.rate = rate
+        self.burst = burst
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.buckets = {}
+        self.breakers = {}
+        self._lock = threading.Lock()
+
+    def _get(self, host):
+        with self._lock:
+            if host not in self.breakers:
+                self.buckets[host] = TokenBucket(self.rate, self.burst) if self.rate > 0 else None
+                self.breakers[host] = CircuitBreaker(self.threshold, self.cooldown) if self.threshold > 0 else None
+            return self.buckets[host], self.breakers[host]
+
+    def before(self, host):
+        bucket, breaker = self._get(host)
+        if breaker is not None:
+            breaker.before(host)
+        if bucket is not None:
+            bucket.acquire()
+
+    def after(self, host, response=None):
+        # response None means the request raised (connection refused, timeout, ...)
+        bucket, breaker = self._get(host)
+        if bucket is not None and response is not None:
+            if response.status_code in THROTTLE_STATUSES:
+                bucket.slow_down(retry_after(response))
+            else:
+                bucket.speed_up()
+        if breaker is not None:
+            if response is None or response.status_code >= 500:
+                breaker.failure()
+            else:
+                breaker.success()
+
+    def counters(self):
+        buckets = [bucket for bucket in self.buckets.values() if bucket is not None]
+        breakers = [breaker for breaker in self.breakers.values() if breaker is not None]
+        return {
+            "throttle_wait_ms": round(sum(bucket.waited for bucket in buckets) * 1000),
+            "breaker_opened": sum(breaker.opened for breaker in breakers),
+            "breaker_rejected": sum(breaker.rejected for breaker in breakers),
+        }
+
+
+def retry_after(response):
+    # only the delay-seconds form, an HTTP date is left to the normal halving
+    try:
+        return float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None